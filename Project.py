@@ -1,3 +1,16 @@
+import os
+import io
+import sys
+import time
+import argparse
+import json
+import struct
+import weakref
+import threading
+from collections import OrderedDict
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import cv2
 import numpy as np
 import tkinter as tk
@@ -8,6 +21,1874 @@ matplotlib.use('TkAgg')
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+# ========== IMAGE MODEL ==========
+# Results keep the channel count they naturally have: gray and binary outputs stay
+# single-channel and are only expanded for display. Binary versions are stored in
+# history at one bit per pixel. Image versions are read-only once committed, so the
+# original, the current image and history entries share arrays instead of copying;
+# anything that needs to change pixels works on a new array.
+def freeze(img):
+    if img is not None:
+        img.flags.writeable = False
+    return img
+
+class BufferPool:
+    # Scratch arrays reused across calls, one per purpose; a key hands back the same
+    # buffer while the shape and dtype stay the same, so callers must be done with
+    # its previous contents
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, key, shape, dtype=np.uint8):
+        buf = self.buffers.get(key)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = self.buffers[key] = np.empty(shape, dtype)
+        return buf
+
+class PackedBinary:
+    def __init__(self, image):
+        self.shape = image.shape
+        self.bits = np.packbits(image, axis=-1)
+        # Hand back the live array while it still exists elsewhere (e.g. current_image)
+        self._unpacked = weakref.ref(image)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def unpack(self):
+        img = self._unpacked()
+        if img is None:
+            img = np.unpackbits(self.bits, axis=-1, count=self.shape[1])
+            np.multiply(img, 255, out=img)
+            self._unpacked = weakref.ref(img)
+        return img
+
+def is_binary(img, hist=None):
+    if len(img.shape) != 2 or img.dtype != np.uint8:
+        return False
+    if hist is None:
+        hist = cv2.calcHist([img], [0], None, [256], [0, 256]).ravel()
+    return hist[0] + hist[255] == img.size
+
+def to_uint8(img):
+    # 8-bit view of high-depth data for display, histograms and 8-bit-only operations
+    if img.dtype == np.uint8:
+        return img
+    if img.dtype == np.uint16:
+        return (img >> 8).astype(np.uint8)
+    return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+
+def pack_for_history(img, binary=None):
+    if binary is None:
+        binary = is_binary(img)
+    return PackedBinary(img) if binary else img
+
+def unpack_from_history(entry):
+    return entry.unpack() if isinstance(entry, PackedBinary) else entry
+
+# ========== DECODED IMAGE CACHE ==========
+# Decoded files (and resized copies of them) kept in memory, least recently used
+# first out once the byte budget is exceeded. Keys include the file's mtime and size,
+# so an edited file is decoded again. Entries are frozen and shared, never copied.
+IMAGE_CACHE_BYTES = 1 << 30
+
+class ImageCache:
+    def __init__(self, max_bytes=IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            img = self.entries.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return img
+
+    def put(self, key, img):
+        if img.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            # Older versions of the same file will not be asked for again
+            for old in [k for k in self.entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                self.nbytes -= self.entries.pop(old).nbytes
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key).nbytes
+            self.entries[key] = img
+            self.nbytes += img.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+image_cache = ImageCache()
+
+def read_image(path, flags=cv2.IMREAD_ANYDEPTH | cv2.IMREAD_COLOR, size=None, cache=image_cache):
+    # size is (width, height) as cv2.resize takes it; float64 data comes back as float32
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size, flags, size)
+    img = cache.get(key) if cache is not None else None
+    if img is not None:
+        return img
+    if size is None:
+        img = cv2.imread(path, flags)
+        if img is None:
+            return None
+        if img.dtype == np.float64:
+            img = img.astype(np.float32)
+    else:
+        full = read_image(path, flags, None, cache)
+        if full is None:
+            return None
+        img = cv2.resize(full, size)
+    freeze(img)
+    if cache is not None:
+        cache.put(key, img)
+    return img
+
+# ========== HALFTONING ENGINE ==========
+# Error-diffusion kernels as (dy, dx, weight) taps relative to the current pixel.
+ERROR_DIFFUSION_KERNELS = {
+    'floyd-steinberg': [(0, 1, 7/16), (1, -1, 3/16), (1, 0, 5/16), (1, 1, 1/16)],
+    'jarvis': [(0, 1, 7/48), (0, 2, 5/48),
+               (1, -2, 3/48), (1, -1, 5/48), (1, 0, 7/48), (1, 1, 5/48), (1, 2, 3/48),
+               (2, -2, 1/48), (2, -1, 3/48), (2, 0, 5/48), (2, 1, 3/48), (2, 2, 1/48)],
+    'stucki': [(0, 1, 8/42), (0, 2, 4/42),
+               (1, -2, 2/42), (1, -1, 4/42), (1, 0, 8/42), (1, 1, 4/42), (1, 2, 2/42),
+               (2, -2, 1/42), (2, -1, 2/42), (2, 0, 4/42), (2, 1, 2/42), (2, 2, 1/42)],
+    'atkinson': [(0, 1, 1/8), (0, 2, 1/8), (1, -1, 1/8), (1, 0, 1/8), (1, 1, 1/8), (2, 0, 1/8)],
+}
+
+def bayer_matrix(order):
+    # Recursive Bayer index matrix of size 2^order x 2^order
+    m = np.zeros((1, 1), dtype=np.int32)
+    for _ in range(order):
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return m
+
+DITHER_STRATEGIES = ('index', 'tile', 'rows')
+
+def ordered_dither(gray_img, order=1, strategy=None):
+    m = bayer_matrix(order)
+    n = m.shape[0]
+    # For integer pixels, g > m*256/n^2 is the same as g > floor(m*256/n^2)
+    threshold_map = (m * 256 // (n * n)).astype(np.uint8)
+    h, w = gray_img.shape
+    strategy = strategy or tuned_value('dither_strategy', h * w, 'index')
+    if strategy == 'rows':
+        # One broadcast comparison per matrix row, against that row repeated across
+        out = np.empty((h, w), dtype=np.uint8)
+        for r in range(min(n, h)):
+            np.greater(gray_img[r::n], np.resize(threshold_map[r], w), out=out[r::n])
+        return out * np.uint8(255)
+    if strategy == 'tile':
+        full = np.tile(threshold_map, (-(-h // n), -(-w // n)))[:h, :w]
+    else:
+        rows = np.arange(h) % n
+        cols = np.arange(w) % n
+        full = threshold_map[rows[:, None], cols[None, :]]
+    return (gray_img > full).astype(np.uint8) * 255
+
+def error_diffusion(gray_img, kernel='floyd-steinberg', serpentine=False):
+    return error_diffusion_strip(gray_img, kernel, serpentine)[0]
+
+def error_diffusion_strip(gray_img, kernel='floyd-steinberg', serpentine=False, carry=None, lookahead=None):
+    # One strip of a taller image: carry holds the first rows as left by the previous
+    # strip, lookahead the gray rows after this strip. Returns the strip and the carry
+    # for the next one.
+    taps = ERROR_DIFFUSION_KERNELS[kernel]
+    if serpentine:
+        return _error_diffusion_serpentine(gray_img, taps, carry, lookahead)
+    return _error_diffusion_wavefront(gray_img, taps, carry, lookahead)
+
+def _error_diffusion_wavefront(gray_img, taps, carry=None, lookahead=None):
+    # Pixel (y, x) only depends on pixels with a smaller x + skew*y, so every pixel on
+    # one wavefront can be quantized at once. The image is sheared into a (time, row)
+    # buffer so that each wavefront and each error tap is a contiguous slice.
+    h, w = gray_img.shape
+    skew = max([1] + [(-dx) // dy + 1 for dy, dx, _ in taps if dy > 0])
+    shifted = [(dx + skew * dy, dy, np.float32(wgt)) for dy, dx, wgt in taps]
+    max_dt = max(dt for dt, _, _ in shifted)
+    max_dy = max(dy for _, dy, _ in shifted)
+    steps = w + skew * (h - 1)
+    buf = np.zeros((steps + max_dt, h + max_dy), dtype=np.float32)
+    ys = np.arange(h + max_dy)[:, None]
+    t_idx = np.arange(w)[None, :] + skew * ys
+    rows = np.zeros((h + max_dy, w), dtype=np.float32)
+    rows[:h] = gray_img
+    if carry is not None:
+        rows[:len(carry)] = carry
+    if lookahead is not None:
+        rows[h:h + len(lookahead)] = lookahead[:max_dy]
+    buf[t_idx, ys] = rows
+    t_idx, ys, tail = t_idx[:h], ys[:h], (t_idx[h:], ys[h:])
+    out = np.zeros(buf.shape, dtype=np.uint8)
+    for t in range(steps):
+        y0 = max(0, -(-(t - w + 1) // skew))
+        y1 = min(h, t // skew + 1)
+        front = buf[t, y0:y1]
+        on = front >= 128
+        out[t, y0:y1] = on
+        err = front - on * np.float32(255)
+        for dt, dy, wgt in shifted:
+            buf[t + dt, y0 + dy:y1 + dy] += err * wgt
+    return out[t_idx, ys] * np.uint8(255), buf[tail]
+
+def _error_diffusion_serpentine(gray_img, taps, carry=None, lookahead=None):
+    # Alternating scan direction makes every row depend on the whole previous row,
+    # so rows are processed one at a time: in-row propagation is scalar, the
+    # spill into the following rows is vectorized per row. In-row taps only reach
+    # one or two pixels ahead, so the scalar loop carries them in two locals.
+    h, w = gray_img.shape
+    pad = 2
+    buf = np.zeros((h + 2, w + 2 * pad), dtype=np.float32)
+    buf[:h, pad:pad + w] = gray_img
+    if carry is not None:
+        buf[:len(carry), pad:pad + w] = carry
+    if lookahead is not None:
+        buf[h:h + len(lookahead), pad:pad + w] = lookahead[:2]
+    out = np.zeros((h, w), dtype=np.uint8)
+    row_taps = {dx: wgt for dy, dx, wgt in taps if dy == 0}
+    a, b = row_taps.get(1, 0.0), row_taps.get(2, 0.0)
+    down_taps = [(dy, dx, np.float32(wgt)) for dy, dx, wgt in taps if dy > 0]
+    for y in range(h):
+        sign = -1 if y % 2 else 1
+        values = []
+        append = values.append
+        c1 = c2 = 0.0
+        for v in buf[y, pad:pad + w][::sign].tolist():
+            v += c1
+            append(v)
+            if v >= 128:
+                v -= 255.0
+            c1 = c2 + v * a
+            c2 = v * b
+        values = np.array(values)[::sign]
+        on = values >= 128
+        out[y] = on
+        errs = (values - on * 255.0).astype(np.float32)
+        for dy, dx, wgt in down_taps:
+            dx *= sign
+            buf[y + dy, pad + dx:pad + dx + w] += errs * wgt
+    return out * np.uint8(255), buf[h:, pad:pad + w]
+
+PATTERNING_FONTS = np.array([
+    [[0, 0], [0, 0]],
+    [[0, 1], [0, 0]],
+    [[0, 1], [1, 0]],
+    [[1, 1], [0, 1]],
+    [[1, 1], [1, 1]],
+], dtype=np.uint8) * 255
+
+def patterning(gray):
+    # Each pixel becomes a 2x2 dot pattern, doubling both dimensions
+    h, w = gray.shape
+    levels = np.digitize(gray, bins=[51, 102, 153, 204], right=False)
+    return PATTERNING_FONTS[levels].transpose(0, 2, 1, 3).reshape(h * 2, w * 2)
+
+# ========== HALFTONE EXPORT ==========
+# Print-resolution halftones are generated a strip of rows at a time from the gray
+# image and written bit-packed, so the full-resolution page never exists in memory.
+# Strip heights are multiples of 32 to keep Bayer and serpentine phases across strips.
+HALFTONE_STRIP_ROWS = 256
+HALFTONE_EXPORT_DPI = 600
+
+def print_rows(gray, out_w, out_h):
+    # Row reader for gray resampled to out_w x out_h (bilinear, pixel-centre aligned)
+    h, w = gray.shape
+    def rows(y0, y1):
+        sy = np.clip((np.arange(y0, y1) + 0.5) * (h / out_h) - 0.5, 0, h - 1)
+        r0 = np.floor(sy).astype(np.intp)
+        r1 = np.minimum(r0 + 1, h - 1)
+        lo, hi = r0[0], r1[-1] + 1
+        wide = cv2.resize(gray[lo:hi], (out_w, hi - lo), interpolation=cv2.INTER_LINEAR).astype(np.float32)
+        frac = (sy - r0).astype(np.float32)[:, None]
+        return (wide[r0 - lo] * (1 - frac) + wide[r1 - lo] * frac + 0.5).astype(np.uint8)
+    return rows
+
+def halftone_strips(gray, out_w, out_h, method, order=1, kernel='floyd-steinberg', serpentine=False,
+                    strip=HALFTONE_STRIP_ROWS):
+    # Yields consecutive strips of the out_w x out_h halftone (0/255, uint8)
+    if method == "patterning":
+        # Each sampled gray pixel becomes a 2x2 pattern
+        rows = print_rows(gray, (out_w + 1) // 2, (out_h + 1) // 2)
+        for y0 in range(0, out_h, strip):
+            y1 = min(out_h, y0 + strip)
+            yield patterning(rows(y0 // 2, (y1 + 1) // 2))[:y1 - y0, :out_w]
+        return
+    rows = print_rows(gray, out_w, out_h)
+    carry = None
+    for y0 in range(0, out_h, strip):
+        y1 = min(out_h, y0 + strip)
+        if method == "dithering":
+            yield ordered_dither(rows(y0, y1), order)
+            continue
+        lookahead = rows(y1, min(out_h, y1 + 2)) if y1 < out_h else None
+        out, carry = error_diffusion_strip(rows(y0, y1), kernel, serpentine, carry, lookahead)
+        yield out
+
+def write_pbm(path, width, height, strips):
+    with open(path, 'wb') as f:
+        f.write(f"P4\n{width} {height}\n".encode())
+        for s in strips:
+            # PBM stores 1 for black
+            f.write(np.packbits(s == 0, axis=1).tobytes())
+
+def _g4_strip(s):
+    # libtiff (through PIL) encodes the strip; the coded bytes are lifted out of its TIFF
+    h, w = s.shape
+    img = Image.frombytes('1', (w, h), np.packbits(s > 0, axis=1).tobytes())
+    bio = io.BytesIO()
+    img.save(bio, 'TIFF', compression='group4', tiffinfo={278: h})
+    tags = Image.open(io.BytesIO(bio.getvalue())).tag_v2
+    offset, count = tags[273][0], tags[279][0]
+    return bio.getvalue()[offset:offset + count], tags[262]
+
+def write_tiff_1bit(path, width, height, strips, compression='group4', dpi=HALFTONE_EXPORT_DPI,
+                    rows_per_strip=HALFTONE_STRIP_ROWS):
+    # Little-endian baseline TIFF with one bilevel strip per generated strip; the IFD
+    # goes last, once every strip's offset and size is known
+    offsets, counts = [], []
+    photometric = 1
+    with open(path, 'wb') as f:
+        f.write(b'II*\x00' + struct.pack('<I', 0))
+        for s in strips:
+            if compression == 'group4':
+                data, photometric = _g4_strip(s)
+            else:
+                data = np.packbits(s > 0, axis=1).tobytes()
+            offsets.append(f.tell())
+            counts.append(len(data))
+            f.write(data)
+        def block(fmt, *values):
+            if f.tell() % 2:
+                f.write(b'\x00')
+            pos = f.tell()
+            f.write(struct.pack(fmt, *values))
+            return pos
+        n = len(offsets)
+        offsets_at = block(f'<{n}I', *offsets) if n > 1 else offsets[0]
+        counts_at = block(f'<{n}I', *counts) if n > 1 else counts[0]
+        res_at = block('<II', int(dpi), 1)
+        entries = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 1, 1),
+                   (259, 3, 1, 4 if compression == 'group4' else 1), (262, 3, 1, photometric),
+                   (273, 4, n, offsets_at), (277, 3, 1, 1), (278, 4, 1, rows_per_strip),
+                   (279, 4, n, counts_at), (282, 5, 1, res_at), (283, 5, 1, res_at), (296, 3, 1, 2)]
+        if compression == 'group4':
+            entries.append((293, 4, 1, 0))
+        entries.sort()
+        ifd_at = block('<H', len(entries))
+        for tag, kind, count, value in entries:
+            f.write(struct.pack('<HHI', tag, kind, count))
+            f.write(struct.pack('<HH', value, 0) if kind == 3 else struct.pack('<I', value))
+        f.write(struct.pack('<I', 0))
+        f.seek(4)
+        f.write(struct.pack('<I', ifd_at))
+
+def export_halftone(gray, path, scale=1.0, method="dithering", order=1, kernel='floyd-steinberg',
+                    serpentine=False, dpi=HALFTONE_EXPORT_DPI, compression='group4'):
+    # Output format follows the extension: .pbm, or 1-bit TIFF otherwise
+    h, w = gray.shape
+    out_w, out_h = max(1, round(w * scale)), max(1, round(h * scale))
+    strips = halftone_strips(to_uint8(gray), out_w, out_h, method, order, kernel, serpentine)
+    if path.lower().endswith('.pbm'):
+        write_pbm(path, out_w, out_h, strips)
+    else:
+        write_tiff_1bit(path, out_w, out_h, strips, compression, dpi)
+    return out_w, out_h
+
+def halftone_main(argv):
+    parser = argparse.ArgumentParser(prog="Project.py halftone",
+                                     description="Export a print-resolution halftone as 1-bit TIFF (G4) or PBM")
+    parser.add_argument('input')
+    parser.add_argument('output', help=".tif/.tiff for CCITT G4, .pbm for raw PBM")
+    parser.add_argument('--method', choices=["patterning", "dithering", "diffusion"], default="diffusion")
+    parser.add_argument('--order', type=int, default=1, help="Bayer order for dithering")
+    parser.add_argument('--kernel', choices=list(ERROR_DIFFUSION_KERNELS), default='floyd-steinberg')
+    parser.add_argument('--serpentine', action='store_true')
+    parser.add_argument('--scale', type=float, default=1.0, help="output pixels per input pixel")
+    parser.add_argument('--dpi', type=int, default=HALFTONE_EXPORT_DPI)
+    # Fine dither patterns are a worst case for G4 and can come out larger than raw bits
+    parser.add_argument('--compression', choices=['group4', 'none'], default='group4')
+    args = parser.parse_args(argv)
+    gray = read_image(args.input, cv2.IMREAD_GRAYSCALE | cv2.IMREAD_ANYDEPTH)
+    if gray is None:
+        print(f"Cannot read {args.input}", file=sys.stderr)
+        return 1
+    start = time.monotonic()
+    w, h = export_halftone(gray, args.output, args.scale, args.method, args.order, args.kernel,
+                           args.serpentine, args.dpi, args.compression)
+    print(f"Wrote {w}x{h} halftone ({w / args.dpi:.1f}x{h / args.dpi:.1f} in at {args.dpi} dpi) "
+          f"to {args.output} in {time.monotonic() - start:.1f}s")
+    return 0
+
+# ========== MORPHOLOGY ENGINE ==========
+MORPH_OPS = ('erode', 'dilate', 'open', 'close', 'tophat', 'gradient')
+MORPH_VHGW_CROSSOVER = 301
+
+def _morph_identity(dtype, reduce):
+    info = np.iinfo(dtype) if np.issubdtype(dtype, np.integer) else np.finfo(dtype)
+    return info.max if reduce is np.minimum else info.min
+
+def _vhgw(img, k, axis, reduce):
+    # van Herk/Gil-Werman running min/max: block-wise prefix and suffix scans make the
+    # cost three comparisons per pixel whatever the window length. Anchor is k // 2,
+    # matching cv2.erode/cv2.dilate. The scans step through the k rows of every block
+    # at once (ufunc.accumulate is not vectorised); rows are transposed into columns
+    # first so both passes read contiguous memory.
+    if k <= 1:
+        return img.copy()
+    if axis == 1:
+        return cv2.transpose(_vhgw(cv2.transpose(img), k, 0, reduce))
+    n = img.shape[0]
+    rest = img.shape[1:]
+    blocks = -(-(n + k - 1) // k)
+    padded = np.full((blocks * k,) + rest, _morph_identity(img.dtype, reduce), dtype=img.dtype)
+    padded[k // 2:k // 2 + n] = img
+    padded = padded.reshape((blocks, k) + rest)
+    g = np.empty_like(padded)
+    h = np.empty_like(padded)
+    g[:, 0] = padded[:, 0]
+    h[:, k - 1] = padded[:, k - 1]
+    for i in range(1, k):
+        reduce(g[:, i - 1], padded[:, i], out=g[:, i])
+        reduce(h[:, k - i], padded[:, k - 1 - i], out=h[:, k - 1 - i])
+    g = g.reshape((blocks * k,) + rest)
+    h = h.reshape((blocks * k,) + rest)
+    return reduce(h[:n], g[k - 1:k - 1 + n])
+
+def _vhgw_diagonal(img, k, reduce, rising):
+    # Shear so the diagonal becomes a column, run the 1D pass, then shear back
+    h, w = img.shape[:2]
+    ys = np.arange(h)[:, None]
+    cols = np.arange(w)[None, :] + (ys if rising else h - 1 - ys)
+    sheared = np.full((h, w + h - 1) + img.shape[2:], _morph_identity(img.dtype, reduce),
+                      dtype=img.dtype)
+    sheared[ys, cols] = img
+    return _vhgw(sheared, k, 0, reduce)[ys, cols]
+
+def _line_kernel(k, angle):
+    if angle == 0:
+        return np.ones((1, k), np.uint8)
+    if angle == 90:
+        return np.ones((k, 1), np.uint8)
+    if angle == 45:
+        return np.ascontiguousarray(np.eye(k, dtype=np.uint8)[::-1])
+    if angle == 135:
+        return np.eye(k, dtype=np.uint8)
+    raise ValueError(f"Unsupported line angle: {angle}")
+
+def _line_pass(img, k, reduce, angle):
+    # OpenCV's SIMD line filters win below the crossover; past it they grow with k
+    # while van Herk/Gil-Werman stays flat.
+    if k < MORPH_VHGW_CROSSOVER:
+        cv_op = cv2.erode if reduce is np.minimum else cv2.dilate
+        return cv_op(img, _line_kernel(k, angle))
+    if angle in (0, 90):
+        return _vhgw(img, k, 1 if angle == 0 else 0, reduce)
+    if angle in (45, 135):
+        return _vhgw_diagonal(img, k, reduce, rising=(angle == 45))
+    raise ValueError(f"Unsupported line angle: {angle}")
+
+def _morph_base(img, reduce, width, height, shape, angle):
+    if shape == 'rect':
+        return _line_pass(_line_pass(img, width, reduce, 0), height, reduce, 90)
+    return _line_pass(img, width, reduce, angle)
+
+def morphology(img, op, width=3, height=3, shape='rect', angle=0):
+    erode = lambda a: _morph_base(a, np.minimum, width, height, shape, angle)
+    dilate = lambda a: _morph_base(a, np.maximum, width, height, shape, angle)
+    if op == 'erode':
+        return erode(img)
+    if op == 'dilate':
+        return dilate(img)
+    if op == 'open':
+        return dilate(erode(img))
+    if op == 'close':
+        return erode(dilate(img))
+    if op == 'tophat':
+        return cv2.subtract(img, dilate(erode(img)))
+    if op == 'gradient':
+        return cv2.subtract(dilate(img), erode(img))
+    raise ValueError(f"Unknown morphology operation: {op}")
+
+# ========== MEDIAN ENGINE ==========
+# cv2.medianBlur covers 8-bit data at any size (a constant-time histogram filter) and
+# 16-bit/float only up to 5×5. Wider integer data is reduced to 8-bit problems: the
+# median commutes with any monotone map, so median(v >> 8) gives the high bits exactly,
+# and for centres whose high bits are h, clipping v to [256h, 256h + 255] turns the
+# remaining bits into one more 8-bit median. Tiles where many levels meet fall back to
+# sorting the windows directly, whichever is estimated cheaper.
+MEDIAN_TILE = 64
+MEDIAN_BAND_COST = 90   # ns per pixel of one 8-bit band pass on a tile
+MEDIAN_SORT_COST = 8    # ns per window element partitioned
+
+def _median_sorted(src, k, th, tw):
+    windows = np.lib.stride_tricks.sliding_window_view(src, (k, k)).reshape(th, tw, k * k)
+    return np.partition(windows, k * k // 2, axis=-1)[..., k * k // 2]
+
+def _median_uint(v, k):
+    if int(v.max()) < 256:
+        return cv2.medianBlur(v.astype(np.uint8), k).astype(v.dtype)
+    hi = _median_uint(v >> 8, k)
+    r = k // 2
+    h, w = v.shape
+    padded = np.pad(v, r, mode='edge')   # cv2.medianBlur replicates borders too
+    out = np.empty_like(v)
+    tile = max(MEDIAN_TILE, 2 * k)
+    for ty in range(0, h, tile):
+        for tx in range(0, w, tile):
+            hi_t = hi[ty:ty + tile, tx:tx + tile]
+            th, tw = hi_t.shape
+            src = padded[ty:ty + th + 2 * r, tx:tx + tw + 2 * r]
+            out_t = out[ty:ty + th, tx:tx + tw]
+            levels = np.unique(hi_t)
+            if len(levels) * MEDIAN_BAND_COST * src.size > MEDIAN_SORT_COST * th * tw * k * k:
+                out_t[:] = _median_sorted(src, k, th, tw)
+                continue
+            for level in levels:
+                base = v.dtype.type(int(level) << 8)
+                band = (np.clip(src, base, base + 255) - base).astype(np.uint8)
+                med = cv2.medianBlur(band, k)[r:r + th, r:r + tw]
+                sel = hi_t == level
+                out_t[sel] = med[sel] + base
+    return out
+
+def median_filter(img, k):
+    if img.dtype == np.uint8 or (k <= 5 and img.dtype in (np.uint16, np.float32)):
+        return cv2.medianBlur(img, k)
+    if len(img.shape) == 3:
+        return cv2.merge([median_filter(c, k) for c in cv2.split(img)])
+    if img.dtype.kind == 'u':
+        return _median_uint(img, k)
+    # Floats and signed data go through their ranks, another monotone map
+    values, ranks = np.unique(img, return_inverse=True)
+    return values[_median_uint(ranks.reshape(img.shape).astype(np.uint32), k)]
+
+# ========== HISTOGRAM EQUALIZATION ==========
+# Global equalization and CLAHE on 8-bit planes, following OpenCV's equalizeHist and
+# CLAHE definitions. CLAHE is split into stages that ImageStats caches separately:
+# per-tile histograms (depend on the tile grid), clipped LUTs (also on the clip
+# limit), and the blend of the four nearest tile LUTs at every pixel.
+EQ_MODE_NAMES = {'channels': "per channel", 'luminance': "luminance"}
+
+def equalize_lut(hist):
+    hist = hist.astype(np.int64)
+    first = int(np.flatnonzero(hist)[0])
+    total = int(hist.sum())
+    if hist[first] == total:
+        return np.full(256, first, dtype=np.uint8)
+    scale = np.float32(255.0 / (total - hist[first]))
+    lut = np.zeros(256, dtype=np.uint8)
+    lut[first + 1:] = np.clip(np.rint(np.cumsum(hist[first + 1:]).astype(np.float32) * scale), 0, 255)
+    return lut
+
+def clahe_tile_size(shape, grid):
+    # Sizes not divisible by the grid are padded at the bottom and right, as OpenCV does
+    h, w = shape
+    if h % grid or w % grid:
+        h, w = h + grid - h % grid, w + grid - w % grid
+    return h // grid, w // grid
+
+def clahe_tile_histograms(plane, grid):
+    th, tw = clahe_tile_size(plane.shape, grid)
+    h, w = plane.shape
+    if (th * grid, tw * grid) != (h, w):
+        plane = cv2.copyMakeBorder(plane, 0, th * grid - h, 0, tw * grid - w, cv2.BORDER_REFLECT_101)
+    def tile_row(ty):
+        band = plane[ty * th:(ty + 1) * th]
+        return [cv2.calcHist([band[:, tx * tw:(tx + 1) * tw]], [0], None, [256], [0, 256]).ravel()
+                for tx in range(grid)]
+    return np.array(list(_get_executor_pool().map(tile_row, range(grid))), dtype=np.int64)
+
+def clahe_luts(hists, tile_area, clip):
+    # Clips each tile histogram, hands the excess back evenly, then equalizes
+    grid = hists.shape[0]
+    hists = hists.reshape(-1, 256).copy()
+    if clip > 0:
+        limit = max(int(clip * tile_area / 256), 1)
+        excess = np.maximum(hists - limit, 0).sum(axis=1)
+        np.minimum(hists, limit, out=hists)
+        hists += (excess // 256)[:, None]
+        for t, residual in enumerate(excess % 256):
+            if residual:
+                step = max(256 // residual, 1)
+                hists[t, np.arange(0, 256, step)[:residual]] += 1
+    scale = np.float32(255.0 / tile_area)
+    luts = np.clip(np.rint(np.cumsum(hists, axis=1).astype(np.float32) * scale), 0, 255)
+    return luts.astype(np.float32).reshape(grid, grid, 256)
+
+def _blend_axis(n, tile, grid):
+    # Per cell between tile centres: (start, stop, first tile, second tile, weights of the second)
+    f = np.arange(n, dtype=np.float32) * np.float32(1.0 / tile) - np.float32(0.5)
+    lo = np.floor(f).astype(np.intp)
+    weight = (f - lo).astype(np.float32)
+    cells = []
+    for c in np.unique(lo):
+        idx = np.flatnonzero(lo == c)
+        a, b = idx[0], idx[-1] + 1
+        cells.append((a, b, max(c, 0), min(c + 1, grid - 1), weight[a:b]))
+    return cells
+
+def clahe_blend(plane, luts, grid):
+    th, tw = clahe_tile_size(plane.shape, grid)
+    out = np.empty_like(plane)
+    def cell(rows_cols):
+        (y0, y1, ty1, ty2, ya), (x0, x1, tx1, tx2, xa) = rows_cols
+        src = plane[y0:y1, x0:x1]
+        top1, top2 = cv2.LUT(src, luts[ty1, tx1]), cv2.LUT(src, luts[ty1, tx2])
+        bot1, bot2 = cv2.LUT(src, luts[ty2, tx1]), cv2.LUT(src, luts[ty2, tx2])
+        xa1, ya = xa[None, :], ya[:, None]
+        top1 *= 1 - xa1
+        top2 *= xa1
+        top1 += top2
+        bot1 *= 1 - xa1
+        bot2 *= xa1
+        bot1 += bot2
+        top1 *= 1 - ya
+        bot1 *= ya
+        top1 += bot1
+        out[y0:y1, x0:x1] = cv2.convertScaleAbs(top1)
+    cells = [(r, c) for r in _blend_axis(plane.shape[0], th, grid) for c in _blend_axis(plane.shape[1], tw, grid)]
+    list(_get_executor_pool().map(cell, cells))
+    return out
+
+# ========== DERIVED IMAGE DATA ==========
+IMAGE_STATS_CACHE_SIZE = 3
+
+def gaussian_ksize(sigma, dtype=np.uint8):
+    # Same aperture cv2.GaussianBlur picks for ksize=(0, 0)
+    return int(round(sigma * (3 if dtype == np.uint8 else 4) * 2 + 1)) | 1
+
+GAUSSIAN_IIR_CROSSOVER = 97
+RECURSIVE_GAUSSIAN_MAX_SIGMA = 24
+
+def _yvv_coefficients(sigma):
+    # Young & van Vliet (1995) third-order recursive Gaussian
+    if sigma >= 2.5:
+        q = 0.98711 * sigma - 0.96330
+    else:
+        q = 3.97156 - 4.14554 * np.sqrt(1 - 0.26891 * sigma)
+    b0 = 1.57825 + 2.44413 * q + 1.4281 * q ** 2 + 0.422205 * q ** 3
+    b1 = 2.44413 * q + 2.85619 * q ** 2 + 1.26661 * q ** 3
+    b2 = -(1.4281 * q ** 2 + 1.26661 * q ** 3)
+    b3 = 0.422205 * q ** 3
+    return 1 - (b1 + b2 + b3) / b0, b1 / b0, b2 / b0, b3 / b0
+
+def _recursive_pass(data, coeffs, pad):
+    # Causal then anti-causal filtering along axis 0, vectorised over the other axes.
+    # The causal pass starts from the steady state of the replicated first row; it runs
+    # `pad` rows past the end on the replicated last row so the anti-causal pass can
+    # start from a steady state too
+    B, c1, c2, c3 = (np.float32(c) for c in coeffs)
+    n = data.shape[0]
+    m = n + pad
+    w = np.empty((m + 3,) + data.shape[1:], dtype=np.float32)
+    w[:3] = data[0]
+    tmp = np.empty(data.shape[1:], dtype=np.float32)
+    for i in range(3, m + 3):
+        np.multiply(data[min(i - 3, n - 1)], B, out=w[i])
+        np.multiply(w[i - 1], c1, out=tmp); w[i] += tmp
+        np.multiply(w[i - 2], c2, out=tmp); w[i] += tmp
+        np.multiply(w[i - 3], c3, out=tmp); w[i] += tmp
+    y = np.empty_like(w)
+    y[m:] = w[m + 2]
+    for i in range(m - 1, -1, -1):
+        np.multiply(w[i + 3], B, out=y[i])
+        np.multiply(y[i + 1], c1, out=tmp); y[i] += tmp
+        np.multiply(y[i + 2], c2, out=tmp); y[i] += tmp
+        np.multiply(y[i + 3], c3, out=tmp); y[i] += tmp
+    return y[:n]
+
+def recursive_gaussian(img, sigma):
+    # Cost per pixel does not depend on sigma. Past RECURSIVE_GAUSSIAN_MAX_SIGMA the
+    # recursion loses accuracy in float32, so the image is first halved with pyrDown
+    # (each level adds variance 4^j at full scale) and the result warped back up
+    data = img.astype(np.float32)
+    levels, variance = 0, sigma * sigma
+    while variance / 4 ** levels > RECURSIVE_GAUSSIAN_MAX_SIGMA ** 2 and min(data.shape[:2]) > 64:
+        data = cv2.pyrDown(data)
+        variance -= 4 ** levels
+        levels += 1
+    sigma_r = np.sqrt(variance) / 2 ** levels
+    coeffs = _yvv_coefficients(sigma_r)
+    pad = int(np.ceil(3 * sigma_r))
+    data = _recursive_pass(data, coeffs, pad)
+    data = np.swapaxes(_recursive_pass(np.ascontiguousarray(np.swapaxes(data, 0, 1)), coeffs, pad), 0, 1)
+    if levels:
+        h, w = img.shape[:2]
+        scale = 1.0 / 2 ** levels
+        data = cv2.warpAffine(np.ascontiguousarray(data), np.float32([[scale, 0, 0], [0, scale, 0]]), (w, h),
+                              flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
+    if img.dtype == np.uint8:
+        return np.clip(np.rint(data), 0, 255).astype(np.uint8)
+    return data.astype(img.dtype)
+
+def gaussian_sigma(ksize, sigma):
+    # Same sigma cv2.getGaussianKernel derives from the aperture when sigma <= 0. That
+    # sigma never shortens the aperture, so sigma <= 0 can still go to OpenCV as is and
+    # keep its fixed small kernels
+    return sigma if sigma > 0 else 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+def gaussian_aperture(ksize, sigma):
+    # Tails past 4 sigma are below 1e-4 of the weight, so a longer aperture only costs time
+    return min(ksize, int(round(gaussian_sigma(ksize, sigma) * 8 + 1)) | 1)
+
+def gaussian_blur(img, ksize, sigma):
+    ksize = gaussian_aperture(ksize, sigma)
+    # Past the crossover a near-complete Gaussian runs recursively; heavily truncated
+    # kernels are not Gaussians any more and stay on the direct path
+    if ksize >= GAUSSIAN_IIR_CROSSOVER and ksize >= 6 * gaussian_sigma(ksize, sigma) + 1:
+        return recursive_gaussian(img, gaussian_sigma(ksize, sigma))
+    return cv2.GaussianBlur(img, (ksize, ksize), sigmaX=sigma, sigmaY=sigma)
+
+def otsu_from_histogram(hist):
+    # Mirrors OpenCV's getThreshVal_Otsu operation for operation (scale = 1/size,
+    # sequential sums, the same product order), so near-ties break the same way and
+    # thresholds match THRESH_OTSU exactly
+    hist = [int(v) for v in hist]
+    scale = 1.0 / sum(hist)
+    mu = 0.0
+    for i, h in enumerate(hist):
+        mu += i * float(h)
+    mu *= scale
+    q1 = mu1 = max_sigma = 0.0
+    max_val = 0
+    eps = float(np.finfo(np.float32).eps)
+    for i, h in enumerate(hist):
+        p_i = h * scale
+        mu1 *= q1
+        q1 += p_i
+        q2 = 1.0 - q1
+        if min(q1, q2) < eps or max(q1, q2) > 1.0 - eps:
+            continue
+        mu1 = (mu1 + i * p_i) / q1
+        mu2 = (mu - q1 * mu1) / q2
+        sigma = q1 * q2 * (mu2 - mu1) * (mu2 - mu1)
+        if sigma > max_sigma:
+            max_sigma = sigma
+            max_val = i
+    return max_val
+
+class ImageStats:
+    # Everything derived from one image version, computed on first use. Images are
+    # never modified in place, so entries stay valid for as long as the image object
+    # they were built from; a new version simply gets a new ImageStats.
+    # There is no summed-area table: box means come from cv2.blur/boxFilter, whose
+    # running sums already cost the same per pixel for any window and beat four
+    # lookups into a cached integral image.
+    def __init__(self, image):
+        self.image = image
+        self._cache = {}
+
+    def _get(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def gray(self):
+        return self._get('gray', lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+                         if len(self.image.shape) == 3 else self.image)
+
+    def histograms(self):
+        # 256-bin histogram per channel (B, G, R or a single gray channel)
+        def compute():
+            img = to_uint8(self.image)
+            channels = img.shape[2] if len(img.shape) == 3 else 1
+            return [cv2.calcHist([img], [c], None, [256], [0, 256]).ravel()
+                    for c in range(channels)]
+        return self._get('hist', compute)
+
+    def gray_histogram(self):
+        if len(self.image.shape) == 2:
+            return self.histograms()[0]
+        return self._get('gray_hist', lambda: cv2.calcHist([self.gray()], [0], None,
+                                                           [256], [0, 256]).ravel())
+
+    # Equalization: the planes a mode works on, their histograms and CLAHE stages
+
+    def planes(self, mode):
+        if len(self.image.shape) == 2:
+            return [self.image]
+        if mode == 'luminance':
+            return [self.ycrcb()[0]]
+        return self._get('planes', lambda: cv2.split(self.image))
+
+    def ycrcb(self):
+        return self._get('ycrcb', lambda: list(cv2.split(cv2.cvtColor(self.image, cv2.COLOR_BGR2YCrCb))))
+
+    def merge_planes(self, mode, planes):
+        if len(self.image.shape) == 2:
+            return planes[0]
+        if mode == 'luminance':
+            return cv2.cvtColor(cv2.merge([planes[0]] + self.ycrcb()[1:]), cv2.COLOR_YCrCb2BGR)
+        return cv2.merge(planes)
+
+    def plane_histogram(self, mode, index):
+        if len(self.image.shape) == 2 or mode != 'luminance':
+            return self.histograms()[index]
+        return self._get('y_hist', lambda: cv2.calcHist([self.ycrcb()[0]], [0], None, [256], [0, 256]).ravel())
+
+    def tile_histograms(self, mode, index, grid):
+        return self._get(('tile_hist', mode, index, grid),
+                         lambda: clahe_tile_histograms(self.planes(mode)[index], grid))
+
+    def clahe_luts(self, mode, index, grid, clip):
+        def compute():
+            th, tw = clahe_tile_size(self.planes(mode)[index].shape, grid)
+            return clahe_luts(self.tile_histograms(mode, index, grid), th * tw, clip)
+        return self._get(('clahe_lut', mode, index, grid, float(clip)), compute)
+
+    def is_binary(self):
+        if len(self.image.shape) != 2 or self.image.dtype != np.uint8:
+            return False
+        return self._get('binary', lambda: is_binary(self.image, self.histograms()[0]))
+
+    def otsu_threshold(self):
+        # Taken from cv2.threshold itself: its IPP path breaks exact ties between
+        # thresholds differently from the reference arithmetic in otsu_from_histogram
+        return self._get('otsu', lambda: int(cv2.threshold(to_uint8(self.gray()), 0, 255,
+                                                           cv2.THRESH_BINARY | cv2.THRESH_OTSU)[0]))
+
+    def spectrum(self):
+        # Centered 2D FFT of the gray image
+        return self._get('spectrum', lambda: np.fft.fftshift(np.fft.fft2(self.gray())))
+
+    def real_spectrum(self):
+        return self._get('rspectrum', lambda: np.fft.rfft2(self.gray().astype(np.float32)))
+
+    def fft_magnitude(self):
+        def compute():
+            magnitude = np.log(1 + np.abs(self.spectrum()))
+            return ((magnitude - magnitude.min()) / (magnitude.max() - magnitude.min()) * 255).astype(np.uint8)
+        return self._get('magnitude', compute)
+
+    # Scale space: Gaussian/LoG levels and the Gaussian octave pyramid
+
+    def gaussian(self, ksize=0, sigma=1.0, gray=False):
+        if ksize <= 0:
+            ksize = gaussian_ksize(sigma, self.image.dtype)
+        src = self.gray() if gray else self.image
+        return self._get(('gauss', ksize, float(sigma), gray),
+                         lambda: gaussian_blur(src, ksize, sigma))
+
+    def laplacian(self, sigma=0.0):
+        # Signed 3×3 Laplacian of the gray image; a Laplacian-of-Gaussian when sigma > 0
+        src = self.gray() if sigma <= 0 else self.gaussian(0, sigma, gray=True)
+        return self._get(('lap', float(sigma)), lambda: cv2.Laplacian(src, cv2.CV_16S, ksize=3))
+
+    def laplacian_abs(self, sigma=0.0):
+        return self._get(('lap_abs', float(sigma)), lambda: cv2.convertScaleAbs(self.laplacian(sigma)))
+
+    def octave(self, level):
+        # Gaussian pyramid of the gray image, level 0 at full resolution
+        if level == 0:
+            return self.gray()
+        return self._get(('octave', level), lambda: cv2.pyrDown(self.octave(level - 1)))
+
+    def log_octave(self, level):
+        return self._get(('log_octave', level), lambda: cv2.convertScaleAbs(
+            cv2.Laplacian(self.octave(level), cv2.CV_16S, ksize=3)))
+
+    def sobel_magnitude(self, level):
+        def compute():
+            src = self.octave(level)
+            gx = cv2.Sobel(src, cv2.CV_32F, 1, 0, ksize=3)
+            gy = cv2.Sobel(src, cv2.CV_32F, 0, 1, ksize=3)
+            return cv2.magnitude(gx, gy)
+        return self._get(('sobel', level), compute)
+
+    def canny(self, level, low, high):
+        return self._get(('canny', level, low, high),
+                         lambda: cv2.Canny(self.octave(level), low, high))
+
+    def multiscale_edges(self, method, levels, low=50, high=150):
+        # Per-octave edge maps upsampled to full size and merged by maximum
+        h, w = self.gray().shape
+        combined = np.zeros((h, w), dtype=np.float32)
+        for level in range(levels):
+            if min(self.octave(level).shape) < 8:
+                break
+            if method == 'sobel':
+                edge, interp = self.sobel_magnitude(level), cv2.INTER_LINEAR
+            elif method == 'canny':
+                edge, interp = self.canny(level, low, high), cv2.INTER_NEAREST
+            else:
+                edge, interp = self.log_octave(level), cv2.INTER_LINEAR
+            if level > 0:
+                edge = cv2.resize(edge, (w, h), interpolation=interp)
+            np.maximum(combined, edge, out=combined)
+        if method == 'sobel':
+            peak = combined.max()
+            if peak > 0:
+                combined *= 255.0 / peak
+        return combined.astype(np.uint8)
+
+# ========== OPERATION REGISTRY ==========
+# Operations declare what they are (pointwise, separable, channel-independent, the
+# halo they read beyond a tile) and execute_operation picks how to run them.
+EXECUTOR_PARALLEL_MIN_PIXELS = 2_000_000
+HIGH_DEPTHS = (np.uint8, np.uint16, np.float32)
+BAND_ALIGN = 32
+_executor_pool = None
+
+class Param:
+    def __init__(self, name, widget, cast=int, odd=False):
+        self.name, self.widget, self.cast, self.odd = name, widget, cast, odd
+
+    def read(self, editor):
+        value = self.cast(getattr(editor, self.widget).get())
+        if self.odd and value % 2 == 0:
+            value += 1
+        return value
+
+class Operation:
+    def __init__(self, name, func, params=(), status="", halo=0, tileable=None,
+                 pointwise=False, gray_input=False, separable=False, linear_kernel=None,
+                 channel_independent=False, uses_cache=False, depths=(np.uint8,), context=(),
+                 align=1, roi_exact=True):
+        self.name, self.func, self.params, self.status = name, func, list(params), status
+        # halo: int, callable(params), or None when every output pixel depends on the whole image
+        self.halo = halo
+        # Period of a position-dependent pattern (int or callable(params)); crops start on a
+        # multiple of it so the pattern stays in phase with the whole image
+        self.align = align
+        # False when a crop cannot reproduce the full-image result (e.g. a global
+        # normalisation); a selection then runs on the whole image and is cut out after
+        self.roi_exact = roi_exact
+        self.tileable = halo is not None if tileable is None else tileable
+        self.pointwise, self.gray_input = pointwise, gray_input
+        self.separable, self.channel_independent = separable, channel_independent
+        # Linear filters give their kernel as callable(params); for separable ones it is the
+        # 1-D factor, and only those are merged when chains are planned
+        self.linear_kernel = linear_kernel
+        # Reads ImageStats caches, so splitting the image would throw cached work away
+        self.uses_cache = uses_cache
+        # Sample types handled natively; anything else is converted to 8-bit first
+        self.depths = depths
+        # Keyword arguments that describe the run rather than the operation (e.g. whether it
+        # is confined to a selection); filled in by the caller, never saved with a macro
+        self.context = context
+
+    def read_params(self, editor):
+        return {p.name: p.read(editor) for p in self.params}
+
+    def with_context(self, params, context):
+        return dict(params, **{k: context[k] for k in self.context if k in context})
+
+    def halo_for(self, params):
+        return self.halo(params) if callable(self.halo) else self.halo
+
+    def align_for(self, params):
+        return self.align(params) if callable(self.align) else self.align
+
+    def describe(self, params, region=""):
+        if callable(self.status):
+            return self.status(params, region)
+        return self.status.format(region=region, **params)
+
+OPERATIONS = {}
+
+def register_operation(name, **capabilities):
+    def decorator(func):
+        OPERATIONS[name] = Operation(name, func, **capabilities)
+        return func
+    return decorator
+
+def _get_executor_pool():
+    global _executor_pool
+    if _executor_pool is None:
+        _executor_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+    return _executor_pool
+
+def point_lut(op, params):
+    # Pointwise ops on 8-bit data reduce to a 256-entry table
+    ramp = np.arange(256, dtype=np.uint8).reshape(1, 256)
+    return op.func(ImageStats(ramp), **params).reshape(1, 256)
+
+def _execute_pointwise(op, stats, params):
+    src = stats.gray() if op.gray_input else stats.image
+    return cv2.LUT(src, point_lut(op, params))
+
+def _execute_channels(op, img, params):
+    planes = cv2.split(img)
+    results = _get_executor_pool().map(lambda p: op.func(ImageStats(p), **params), planes)
+    return cv2.merge(list(results))
+
+def band_ranges(h, bands, halo):
+    # (y0, y1, top, bottom) per band; starts are aligned so position-dependent
+    # patterns such as Bayer dithering line up across bands
+    step = -(-h // bands)
+    step = -(-step // BAND_ALIGN) * BAND_ALIGN
+    return [(y0, min(h, y0 + step), max(0, y0 - halo), min(h, y0 + step + halo))
+            for y0 in range(0, h, step)]
+
+def _execute_bands(op, img, params, halo, bands):
+    # Horizontal bands padded by the halo; each band copies its own rows into the
+    # output as soon as it finishes, so band results never pile up
+    out = []
+    lock = threading.Lock()
+    def band(rng):
+        y0, y1, top, bottom = rng
+        result = op.func(ImageStats(img[top:bottom]), **params)
+        with lock:
+            if not out:
+                out.append(np.empty((img.shape[0],) + result.shape[1:], result.dtype))
+        out[0][y0:y1] = result[y0 - top:y1 - top]
+    list(_get_executor_pool().map(band, band_ranges(img.shape[0], bands, halo)))
+    return out[0]
+
+def execute_operation(op, stats, params):
+    img = stats.image
+    use_tuned_threads(img.shape[0] * img.shape[1])
+    if op.pointwise and img.dtype == np.uint8:
+        return _execute_pointwise(op, stats, params)
+    large = img.shape[0] * img.shape[1] >= EXECUTOR_PARALLEL_MIN_PIXELS
+    halo = op.halo_for(params)
+    tileable = op.tileable and halo is not None
+    if large and tileable and _shared_executor is not None:
+        return _shared_executor.run(op, img, params, halo)
+    workers = os.cpu_count() or 1
+    if workers > 1 and large and not op.uses_cache:
+        if op.channel_independent and len(img.shape) == 3:
+            return _execute_channels(op, img, params)
+        if tileable and img.shape[0] >= 4 * workers * (halo + 1):
+            return _execute_bands(op, img, params, halo, workers)
+    return op.func(stats, **params)
+
+@register_operation('brightness_contrast', pointwise=True, channel_independent=True,
+                    params=[Param('brightness', 'brightness_scale'),
+                            Param('contrast', 'contrast_scale', float)],
+                    status="Adjusted{region}: Brightness={brightness}, Contrast={contrast}")
+def _op_brightness_contrast(stats, brightness, contrast):
+    img_float = stats.image.astype(np.float32)
+    scaled = cv2.multiply(img_float, contrast)
+    adjusted = cv2.add(scaled, brightness)
+    return np.clip(adjusted, 0, 255).astype(np.uint8)
+
+@register_operation('laplacian_edge', halo=1, uses_cache=True,
+                    status="✓ Laplacian Edge applied{region}")
+def _op_laplacian_edge(stats):
+    return stats.laplacian_abs()
+
+EDGE_METHOD_NAMES = {'sobel': "Sobel", 'canny': "Canny", 'log': "LoG"}
+
+# The Sobel normalisation is global and the pyramid phase follows the image origin,
+# so the result can neither be tiled nor computed from a crop of the image
+@register_operation('multiscale_edges', halo=None, uses_cache=True, roi_exact=False,
+                    params=[Param('method', 'edge_method', str), Param('levels', 'edge_levels'),
+                            Param('low', 'canny_low'), Param('high', 'canny_high')],
+                    status=lambda p, region: f"✓ Multi-scale {EDGE_METHOD_NAMES[p['method']]} "
+                                             f"edges ({p['levels']} levels) applied{region}")
+def _op_multiscale_edges(stats, method, levels, low, high):
+    return stats.multiscale_edges(method, levels, low, high)
+
+@register_operation('otsu_threshold', halo=None, uses_cache=True,
+                    status="✓ Otsu Threshold applied{region}")
+def _op_otsu_threshold(stats):
+    _, binary = cv2.threshold(stats.gray(), stats.otsu_threshold(), 255, cv2.THRESH_BINARY)
+    return binary
+
+LOGIC_OPS = {'AND': cv2.bitwise_and, 'OR': cv2.bitwise_or, 'XOR': cv2.bitwise_xor}
+
+# The second operand is passed in by the caller, already cropped to the region
+@register_operation('logic', tileable=False, status="✓ BitFields {op} applied{region}")
+def _op_logic(stats, op, other):
+    img = stats.image
+    if len(img.shape) == 2 and len(other.shape) == 3:
+        other = cv2.cvtColor(other, cv2.COLOR_BGR2GRAY)
+    return LOGIC_OPS[op](img, other)
+
+def _halftone_status(p, region):
+    if p['method'] == "patterning":
+        msg = "Patterning halftoning applied"
+    elif p['method'] == "dithering":
+        n = 2 ** p['order']
+        msg = f"Dithering halftoning applied (Bayer {n}×{n})"
+    else:
+        msg = f"Error diffusion applied ({p['kernel']}{', serpentine' if p['serpentine'] else ''})"
+    return f"✓ {msg}{region}"
+
+# Only ordered dithering is local; the others need the whole image
+# Patterning inside a selection keeps the size, since the result is pasted back in place
+@register_operation('halftone', halo=lambda p: 0 if p['method'] == "dithering" else None,
+                    align=lambda p: 2 ** p['order'] if p['method'] == "dithering" else 1,
+                    uses_cache=True, status=_halftone_status, context=('keep_size',),
+                    params=[Param('method', 'halftone_method', str), Param('order', 'bayer_order'),
+                            Param('kernel', 'diffusion_kernel', str),
+                            Param('serpentine', 'serpentine_scan', bool)])
+def _op_halftone(stats, method, order, kernel, serpentine, keep_size=False):
+    gray = stats.gray()
+    if method == "patterning":
+        if not keep_size:
+            return patterning(gray)
+        # Patterning doubles the size; to keep it, pattern 2×2 blocks instead
+        h, w = gray.shape
+        half = cv2.resize(gray, ((w + 1) // 2, (h + 1) // 2), interpolation=cv2.INTER_AREA)
+        return patterning(half)[:h, :w]
+    if method == "dithering":
+        return ordered_dither(gray, order)
+    return error_diffusion(gray, kernel, serpentine)
+
+@register_operation('mean_filter', halo=lambda p: p['k'] // 2, separable=True,
+                    linear_kernel=lambda p: np.full(p['k'], 1.0 / p['k']), channel_independent=True,
+                    depths=HIGH_DEPTHS, params=[Param('k', 'mean_kernel', odd=True)],
+                    status="✓ Mean blur ({k}×{k}) applied{region}")
+def _op_mean_filter(stats, k):
+    return cv2.blur(stats.image, (k, k))
+
+@register_operation('gaussian_filter', halo=lambda p: gaussian_aperture(p['k'], p['sigma']) // 2, separable=True,
+                    linear_kernel=lambda p: cv2.getGaussianKernel(gaussian_aperture(p['k'], p['sigma']),
+                                                                  p['sigma']).ravel(),
+                    channel_independent=True, uses_cache=True, depths=HIGH_DEPTHS,
+                    params=[Param('k', 'gauss_kernel', odd=True), Param('sigma', 'gauss_sigma', float)],
+                    status="✓ Gaussian blur ({k}×{k}, σ={sigma}) applied{region}")
+def _op_gaussian_filter(stats, k, sigma):
+    return stats.gaussian(k, sigma)
+
+@register_operation('median_filter', halo=lambda p: p['k'] // 2, channel_independent=True,
+                    depths=HIGH_DEPTHS, params=[Param('k', 'median_kernel', odd=True)],
+                    status="✓ Median filter ({k}×{k}) applied{region}")
+def _op_median_filter(stats, k):
+    return median_filter(stats.image, k)
+
+@register_operation('sharpen_laplacian', halo=1, uses_cache=True,
+                    status="✓ Laplacian sharpening applied{region}")
+def _op_sharpen_laplacian(stats):
+    return cv2.addWeighted(stats.gray(), 1.5, stats.laplacian_abs(), -0.5, 0)
+
+@register_operation('unsharp_mask', halo=gaussian_ksize(1.0) // 2, channel_independent=True,
+                    uses_cache=True, status="✓ Unsharp masking applied{region}")
+def _op_unsharp_mask(stats):
+    blurred = stats.gaussian(0, 1.0)
+    sharpened = cv2.addWeighted(stats.image, 1.5, blurred, -0.5, 0)
+    return np.clip(sharpened, 0, 255).astype(np.uint8)
+
+def ideal_filter(fshift, filter_type, D0):
+    rows, cols = fshift.shape
+    crow, ccol = rows // 2, cols // 2
+    i, j = np.ogrid[:rows, :cols]
+    D = np.sqrt((i - crow)**2 + (j - ccol)**2)
+    mask = (D <= D0) if filter_type == 'lowpass' else (D > D0)
+    img_back = np.abs(np.fft.ifft2(np.fft.ifftshift(fshift * mask)))
+    return np.clip(img_back, 0, 255).astype(np.uint8)
+
+@register_operation('ideal_lowpass', halo=None, uses_cache=True,
+                    params=[Param('D0', 'cutoff_scale')],
+                    status="✓ Ideal LPF applied (D₀={D0}){region}")
+def _op_ideal_lowpass(stats, D0):
+    return ideal_filter(stats.spectrum(), 'lowpass', D0)
+
+@register_operation('ideal_highpass', halo=None, uses_cache=True,
+                    params=[Param('D0', 'cutoff_scale')],
+                    status="✓ Ideal HPF applied (D₀={D0}){region}")
+def _op_ideal_highpass(stats, D0):
+    return ideal_filter(stats.spectrum(), 'highpass', D0)
+
+@register_operation('global_threshold', pointwise=True, gray_input=True,
+                    params=[Param('T', 'global_thresh')],
+                    status="✓ Global threshold applied (T={T}){region}")
+def _op_global_threshold(stats, T):
+    _, binary = cv2.threshold(stats.gray(), T, 255, cv2.THRESH_BINARY)
+    return binary
+
+@register_operation('equalize_hist', halo=None, uses_cache=True,
+                    params=[Param('mode', 'eq_mode', str)],
+                    status=lambda p, region: f"✓ Histogram equalization applied "
+                                             f"({EQ_MODE_NAMES[p['mode']]}){region}")
+def _op_equalize_hist(stats, mode):
+    planes = stats.planes(mode)
+    return stats.merge_planes(mode, [cv2.LUT(p, equalize_lut(stats.plane_histogram(mode, i)))
+                                     for i, p in enumerate(planes)])
+
+# Tile LUTs stay cached on the image version, so trying another clip limit only
+# reclips histograms and blends again; another grid recomputes the histograms
+@register_operation('clahe', halo=None, uses_cache=True,
+                    params=[Param('mode', 'eq_mode', str), Param('clip', 'clahe_clip', float),
+                            Param('grid', 'clahe_grid')],
+                    status=lambda p, region: f"✓ CLAHE applied (clip={p['clip']}, {p['grid']}×{p['grid']} tiles, "
+                                             f"{EQ_MODE_NAMES[p['mode']]}){region}")
+def _op_clahe(stats, mode, clip, grid):
+    planes = stats.planes(mode)
+    return stats.merge_planes(mode, [clahe_blend(p, stats.clahe_luts(mode, i, grid, clip), grid)
+                                     for i, p in enumerate(planes)])
+
+@register_operation('adaptive_threshold', halo=lambda p: p['block'] // 2,
+                    params=[Param('block', 'block_size', odd=True),
+                            Param('method', 'adaptive_method', str)],
+                    status=lambda p, region: f"✓ Adaptive {'Gaussian' if p['method'] == 'gaussian' else 'Mean'} "
+                                             f"threshold applied (block={p['block']}){region}")
+def _op_adaptive_threshold(stats, block, method, c=2):
+    if method == "gaussian":
+        adaptive_method = cv2.ADAPTIVE_THRESH_GAUSSIAN_C
+    else:
+        adaptive_method = cv2.ADAPTIVE_THRESH_MEAN_C
+    return cv2.adaptiveThreshold(stats.gray(), 255, adaptive_method, cv2.THRESH_BINARY, block, c)
+
+@register_operation('watershed', halo=None, uses_cache=True,
+                    status="✓ Watershed segmentation applied{region}")
+def _op_watershed(stats):
+    gray = stats.gray()
+    region = stats.image
+    img = region.copy() if len(region.shape) == 3 else cv2.cvtColor(region, cv2.COLOR_GRAY2BGR)
+
+    _, thresh = cv2.threshold(gray, stats.otsu_threshold(), 255, cv2.THRESH_BINARY_INV)
+    # 3×3 open ×2 and dilate ×3 collapse to single 5×5 and 7×7 passes
+    opening = morphology(thresh, 'open', 5, 5)
+    sure_bg = morphology(opening, 'dilate', 7, 7)
+    dist_transform = cv2.distanceTransform(opening, cv2.DIST_L2, 5)
+    _, sure_fg = cv2.threshold(dist_transform, 0.7 * dist_transform.max(), 255, 0)
+    sure_fg = np.uint8(sure_fg)
+    unknown = cv2.subtract(sure_bg, sure_fg)
+    _, markers = cv2.connectedComponents(sure_fg)
+    markers = markers + 1
+    markers[unknown == 255] = 0
+    markers = cv2.watershed(img, markers)
+    img[markers == -1] = [0, 0, 255]
+    return img
+
+def _morphology_halo(p):
+    # Open/close/top-hat chain two passes, so they see twice the reach
+    reach = max(p['width'], p['height']) if p['shape'] == 'rect' else p['width']
+    passes = 1 if p['op'] in ('erode', 'dilate') else 2
+    return passes * (reach // 2 + 1)
+
+def _morphology_status(p, region):
+    if p['shape'] == 'rect':
+        se_text = f"{p['width']}×{p['height']} rect"
+    else:
+        se_text = f"{p['width']}px line @ {p['angle']}°"
+    return f"✓ Morphology {p['op']} ({se_text}) applied{region}"
+
+@register_operation('morphology', halo=_morphology_halo, channel_independent=True, depths=HIGH_DEPTHS,
+                    params=[Param('op', 'morph_op', str), Param('shape', 'morph_shape', str),
+                            Param('width', 'morph_width'), Param('height', 'morph_height'),
+                            Param('angle', 'morph_angle')],
+                    status=_morphology_status)
+def _op_morphology(stats, op, shape, width, height, angle):
+    return morphology(stats.image, op, width, height, shape, angle)
+
+# ========== OPERATION CHAINS ==========
+# A chain is a list of (operation name, params). Consecutive point operations run as
+# one composed LUT and consecutive separable linear filters as one convolution, so
+# each fused run is a single pass over the image with no intermediate copies.
+FILTER_BOX_COST = 5
+
+def plan_chain(steps):
+    # Groups steps into ('lut', [steps]), ('filter', [steps]) and ('op', [step]) stages
+    stages = []
+    for name, params in steps:
+        op = OPERATIONS[name]
+        kind = 'lut' if op.pointwise else 'filter' if op.separable and op.linear_kernel else 'op'
+        if kind != 'op' and stages and stages[-1][0] == kind:
+            stages[-1][1].append((name, params))
+        else:
+            stages.append((kind, [(name, params)]))
+    return stages
+
+def _run_lut_stage(img, steps):
+    lut = None
+    for name, params in steps:
+        op = OPERATIONS[name]
+        if op.gray_input and len(img.shape) == 3:
+            # Gray conversion does not commute with per-channel tables
+            if lut is not None:
+                img = cv2.LUT(img, lut)
+                lut = None
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        step_lut = point_lut(op, params)
+        lut = step_lut if lut is None else step_lut[:, lut[0]]
+    return cv2.LUT(img, lut)
+
+def _run_filter_stage(img, steps):
+    kernel = np.ones(1)
+    for name, params in steps:
+        kernel = np.convolve(kernel, OPERATIONS[name].linear_kernel(params))
+    # Box filters and recursive Gaussians cost the same at any size, so a long merged
+    # kernel can lose to running them one by one; cost is counted in kernel taps
+    separate = sum(FILTER_BOX_COST if name == 'mean_filter'
+                   else min(len(OPERATIONS[name].linear_kernel(params)), GAUSSIAN_IIR_CROSSOVER)
+                   for name, params in steps)
+    if len(steps) == 1 or len(kernel) > separate:
+        for name, params in steps:
+            img = OPERATIONS[name].func(ImageStats(img), **params)
+        return img
+    kernel = kernel.astype(np.float32)
+    return cv2.sepFilter2D(img, -1, kernel, kernel)
+
+def run_chain(img, steps, get_stats=ImageStats, context=None):
+    for kind, group in plan_chain(steps):
+        # Same rule as the editor: data an operation cannot take is brought to 8-bit
+        if any(img.dtype.type not in OPERATIONS[name].depths for name, _ in group):
+            img = to_uint8(img)
+        if kind == 'lut' and img.dtype == np.uint8:
+            img = _run_lut_stage(img, group)
+        elif kind == 'filter':
+            img = _run_filter_stage(img, group)
+        else:
+            for name, params in group:
+                op = OPERATIONS[name]
+                img = execute_operation(op, get_stats(img), op.with_context(params, context or {}))
+    return img
+
+# ========== SHARED-MEMORY EXECUTION ==========
+# Multi-process band execution for one large image. Pixels live in shared memory
+# segments that workers map by name, so only band coordinates are pickled; results
+# are written in place and handed back as views of their segment.
+_shared_executor = None
+_shared_segments = {}
+
+def _segment_view(spec):
+    name, offset, shape, dtype, strides = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf, offset=offset, strides=strides)
+
+def _shared_band_worker(op_name, params, src, dst, band):
+    start = time.perf_counter()
+    y0, y1, top, bottom = band
+    src_shm, img = _segment_view(src)
+    dst_shm, out = _segment_view(dst)
+    try:
+        result = OPERATIONS[op_name].func(ImageStats(img[top:bottom]), **params)
+        out[y0:y1] = result[y0 - top:y1 - top]
+    finally:
+        del img, out
+        src_shm.close()
+        dst_shm.close()
+    return os.getpid(), y1 - y0, time.perf_counter() - start
+
+def _release_segment(shm):
+    _shared_segments.pop(shm.name, None)
+    shm.close()
+    shm.unlink()
+
+def shared_array(shape, dtype):
+    # Array backed by a fresh segment, unlinked once the array is garbage collected
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+    arr = np.ndarray(shape, dtype, buffer=shm.buf)
+    _shared_segments[shm.name] = weakref.ref(arr)
+    weakref.finalize(arr, _release_segment, shm)
+    return arr
+
+def _segment_spec(arr):
+    # Name and layout of a shared segment already holding arr, or None
+    base = arr
+    while isinstance(base.base, np.ndarray):
+        base = base.base
+    for name, ref in _shared_segments.items():
+        if ref() is base:
+            offset = arr.__array_interface__['data'][0] - base.__array_interface__['data'][0]
+            return name, offset, arr.shape, arr.dtype.str, arr.strides
+    return None
+
+class SharedMemoryExecutor:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        # Spawned rather than forked: the GUI process holds Tk and OpenCV threads
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        self.last_timings = []
+
+    def run(self, op, img, params, halo):
+        bands = band_ranges(img.shape[0], self.workers, halo)
+        # A thin probe band tells the output's channels and dtype up front
+        probe = op.func(ImageStats(img[:min(img.shape[0], 2 * halo + BAND_ALIGN)]), **params)
+        out = shared_array((img.shape[0],) + probe.shape[1:], probe.dtype)
+        src_spec = _segment_spec(img)
+        if src_spec is None:
+            src = shared_array(img.shape, img.dtype)
+            src[:] = img
+            src_spec = _segment_spec(src)
+        jobs = [self.pool.submit(_shared_band_worker, op.name, params, src_spec, _segment_spec(out), band)
+                for band in bands]
+        self.last_timings = [job.result() for job in jobs]
+        return out
+
+    def report(self):
+        if not self.last_timings:
+            return ""
+        times = [t for _, _, t in self.last_timings]
+        pids = {pid for pid, _, _ in self.last_timings}
+        return f"{len(times)} bands on {len(pids)} workers, {min(times):.2f}–{max(times):.2f}s each"
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+def set_process_execution(enabled, workers=None):
+    global _shared_executor
+    if _shared_executor is not None:
+        _shared_executor.shutdown()
+        _shared_executor = None
+    if enabled:
+        _shared_executor = SharedMemoryExecutor(workers)
+    return _shared_executor
+
+# ========== PARAMETER SWEEP ==========
+# Widget name -> (label, short label, default from, default to, default count, integer?)
+SWEEP_PARAMS = {
+    'global_thresh': ("Global Threshold", "T", 60, 200, 8, True),
+    'block_size': ("Adaptive Block Size", "block", 3, 51, 8, True),
+    'cutoff_scale': ("Cutoff Radius D₀", "D₀", 5, 120, 8, True),
+    'gauss_sigma': ("Gaussian Sigma σ", "σ", 0.5, 5.0, 8, False),
+}
+SWEEP_THUMB_SIZE = 200
+
+def sweep_values(param, start, stop, count):
+    values = np.linspace(start, stop, max(1, int(count)))
+    if not SWEEP_PARAMS[param][5]:
+        return [round(float(v), 2) for v in values]
+    values = [int(round(v)) for v in values]
+    if param == 'block_size':
+        values = [max(3, v | 1) for v in values]
+    return sorted(set(values))
+
+def _prepare_sweep(stats, param):
+    # Intermediates every sweep job reads but none of them writes
+    gray = stats.gray()
+    shared = {'image': stats.image, 'gray': gray}
+    if param == 'cutoff_scale':
+        rows, cols = gray.shape
+        shared['spectrum'] = stats.real_spectrum()
+        # Radial distance of each unshifted rfft2 bin, same as the centered D(u, v)
+        fy = np.fft.fftfreq(rows) * rows
+        fx = np.arange(cols // 2 + 1)
+        shared['distance'] = np.sqrt(fy[:, None] ** 2 + fx[None, :] ** 2)
+    return shared
+
+def _sweep_one(shared, param, value, fixed):
+    gray = shared['gray']
+    if param == 'global_thresh':
+        return cv2.threshold(gray, value, 255, cv2.THRESH_BINARY)[1]
+    if param == 'block_size':
+        if fixed.get('adaptive_method') == 'gaussian':
+            method = cv2.ADAPTIVE_THRESH_GAUSSIAN_C
+        else:
+            method = cv2.ADAPTIVE_THRESH_MEAN_C
+        return cv2.adaptiveThreshold(gray, 255, method, cv2.THRESH_BINARY, value, 2)
+    if param == 'cutoff_scale':
+        if fixed.get('filter_type') == 'highpass':
+            mask = shared['distance'] > value
+        else:
+            mask = shared['distance'] <= value
+        back = np.fft.irfft2(shared['spectrum'] * mask, s=gray.shape)
+        return np.clip(np.abs(back), 0, 255).astype(np.uint8)
+    if param == 'gauss_sigma':
+        k = fixed.get('gauss_kernel', 0) or gaussian_ksize(value)
+        return gaussian_blur(shared['image'], k, value)
+    raise ValueError(f"Parameter cannot be swept: {param}")
+
+def _thumbnail(img, size):
+    h, w = img.shape[:2]
+    scale = min(size / w, size / h, 1.0)
+    thumb = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))),
+                       interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(thumb, cv2.COLOR_GRAY2BGR) if len(thumb.shape) == 2 else thumb
+
+def run_sweep(img, param, values, fixed=None, stats=None, workers=None, thumb_size=SWEEP_THUMB_SIZE):
+    # Runs one operation per value on a thread pool (cv2 and NumPy release the GIL),
+    # returning (result, thumbnail) pairs; binary results come back bit-packed.
+    fixed = fixed or {}
+    shared = _prepare_sweep(stats or ImageStats(img), param)
+    def job(value):
+        result = _sweep_one(shared, param, value, fixed)
+        return pack_for_history(result), _thumbnail(result, thumb_size)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(job, values))
+
+def make_contact_sheet(thumbs, labels, cols, thumb_size=SWEEP_THUMB_SIZE):
+    pad, label_h = 6, 22
+    cell_w, cell_h = thumb_size + 2 * pad, thumb_size + label_h + 2 * pad
+    rows = -(-len(thumbs) // cols)
+    sheet = np.full((rows * cell_h, cols * cell_w, 3), 0x2b, dtype=np.uint8)
+    for i, (thumb, label) in enumerate(zip(thumbs, labels)):
+        y, x = (i // cols) * cell_h + pad, (i % cols) * cell_w + pad
+        th, tw = thumb.shape[:2]
+        oy, ox = (thumb_size - th) // 2, (thumb_size - tw) // 2
+        sheet[y + oy:y + oy + th, x + ox:x + ox + tw] = thumb
+        cv2.putText(sheet, label, (x + 4, y + thumb_size + label_h - 6),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+    return sheet, cell_w, cell_h
+
+# ========== SEEDED WATERSHED ==========
+SEED_BACKGROUND, SEED_FOREGROUND = 1, 2
+SEED_COLORS = {SEED_BACKGROUND: (255, 128, 0), SEED_FOREGROUND: (0, 255, 0)}
+WATERSHED_WINDOW_MARGIN = 48
+WATERSHED_POLL_MS = 50
+
+class SeededWatershed:
+    # Marker watershed driven by painted seeds. The flood is global (one stroke can move
+    # boundaries anywhere), so only a full cv2.watershed of the seed map is exact. Each
+    # stroke is previewed by re-flooding a window around it from the seeds, growing the
+    # window until the labels on its edge stop changing; the preview is then replaced by
+    # a full run, started with full_run() and adopted with settle().
+    def __init__(self, image):
+        image = to_uint8(image)
+        self.image = image if len(image.shape) == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        self.seeds = np.zeros(image.shape[:2], dtype=np.int32)
+        self.labels = None
+        self.exact = False
+        self.strokes = 0
+        self.overlay = self.image.copy()
+        self.last_window = None
+
+    def add_stroke(self, points, radius, label):
+        h, w = self.seeds.shape
+        pts = np.array(points, dtype=np.int32).reshape(-1, 2)
+        x0, y0 = (int(v) for v in np.maximum(pts.min(axis=0) - radius, 0))
+        x1, y1 = (int(v) for v in np.minimum(pts.max(axis=0) + radius + 1, (w, h)))
+        if x0 >= x1 or y0 >= y1:
+            return None
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        local = (pts - (x0, y0)).reshape(-1, 1, 2)
+        cv2.polylines(mask, [local], False, 1, thickness=2 * radius + 1)
+        for x, y in local.reshape(-1, 2):
+            cv2.circle(mask, (int(x), int(y)), radius, 1, -1)
+        self.seeds[y0:y1, x0:x1][mask.astype(bool)] = label
+        self.strokes += 1
+        box = (y0, y1, x0, x1)
+        if self.labels is None and not {SEED_BACKGROUND, SEED_FOREGROUND} <= set(np.unique(self.seeds)):
+            self._render(box)
+            return box
+        margin = WATERSHED_WINDOW_MARGIN
+        while self.labels is not None:
+            window = (max(0, y0 - margin), min(h, y1 + margin), max(0, x0 - margin), min(w, x1 + margin))
+            if window == (0, h, 0, w):
+                break
+            if self._reflood(window):
+                self.exact = False
+                self.last_window = window
+                self._render(window)
+                return window
+            margin *= 2
+        self.settle(*self.full_run()())
+        return self.last_window
+
+    def _reflood(self, window):
+        h, w = self.seeds.shape
+        y0, y1, x0, x1 = window
+        # Two rings of context: cv2.watershed overwrites the outer one with -1,
+        # the inner one keeps the old labels as fixed fronts
+        cy0, cy1, cx0, cx1 = max(0, y0 - 2), min(h, y1 + 2), max(0, x0 - 2), min(w, x1 + 2)
+        inside = np.zeros((cy1 - cy0, cx1 - cx0), dtype=bool)
+        inside[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0] = True
+        markers = np.where(inside, self.seeds[cy0:cy1, cx0:cx1], self.labels[cy0:cy1, cx0:cx1])
+        markers = cv2.watershed(self.image[cy0:cy1, cx0:cx1], markers.astype(np.int32))
+        new = markers[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0]
+        old = self.labels[y0:y1, x0:x1]
+        # Converged once the labels on every window edge inside the image are unchanged
+        if ((y0 > 0 and (new[0] != old[0]).any()) or (y1 < h and (new[-1] != old[-1]).any()) or
+                (x0 > 0 and (new[:, 0] != old[:, 0]).any()) or (x1 < w and (new[:, -1] != old[:, -1]).any())):
+            return False
+        self.labels[y0:y1, x0:x1] = new
+        return True
+
+    def full_run(self):
+        # Snapshot of the seeds; the returned job can run on another thread
+        strokes, seeds = self.strokes, self.seeds.copy()
+        return lambda: (strokes, cv2.watershed(self.image, seeds))
+
+    def settle(self, strokes, labels):
+        # Adopts a full run unless more strokes were painted since it started
+        if strokes != self.strokes:
+            return False
+        self.labels, self.exact = labels, True
+        self.last_window = (0, self.seeds.shape[0], 0, self.seeds.shape[1])
+        self._render(self.last_window)
+        return True
+
+    def _render(self, window):
+        y0, y1, x0, x1 = window
+        view = self.image[y0:y1, x0:x1].copy()
+        if self.labels is not None:
+            labels = self.labels[y0:y1, x0:x1]
+            fg = labels == SEED_FOREGROUND
+            view[fg] = view[fg] // 2 + np.array((0, 96, 0), dtype=np.uint8)
+            view[labels == -1] = (0, 0, 255)
+        seeds = self.seeds[y0:y1, x0:x1]
+        for label, color in SEED_COLORS.items():
+            view[seeds == label] = color
+        self.overlay[y0:y1, x0:x1] = view
+
+    def result(self):
+        # Boundaries over the image, as the automatic watershed draws them
+        if self.labels is not None and not self.exact:
+            self.settle(*self.full_run()())
+        out = self.image.copy()
+        if self.labels is not None:
+            out[self.labels == -1] = (0, 0, 255)
+        return out
+
+# ========== DATASET STATISTICS ==========
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+DATASET_MAP_SIZE = (256, 256)
+DATASET_CHUNK_SIZE = 32
+DATASET_CHECKPOINT_SECONDS = 30
+
+class DatasetStats:
+    # Sums rather than averages, so per-chunk results merge exactly in any order
+    def __init__(self, map_size=DATASET_MAP_SIZE):
+        self.map_size = tuple(map_size)
+        self.count = 0
+        self.hist = np.zeros((4, 256), dtype=np.int64)        # B, G, R, gray
+        self.otsu_hist = np.zeros(256, dtype=np.int64)        # per-image Otsu thresholds
+        self.sum_map = np.zeros(self.map_size, dtype=np.float64)
+        self.sumsq_map = np.zeros(self.map_size, dtype=np.float64)
+
+    def add(self, img):
+        stats = ImageStats(img)
+        hists = stats.histograms()
+        gray_hist = stats.gray_histogram()
+        if len(hists) == 1:
+            hists = hists * 3
+        self.hist += np.array(hists + [gray_hist], dtype=np.int64)
+        self.otsu_hist[stats.otsu_threshold()] += 1
+        h, w = self.map_size
+        small = cv2.resize(stats.gray(), (w, h), interpolation=cv2.INTER_AREA).astype(np.float64)
+        self.sum_map += small
+        self.sumsq_map += small * small
+        self.count += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.hist += other.hist
+        self.otsu_hist += other.otsu_hist
+        self.sum_map += other.sum_map
+        self.sumsq_map += other.sumsq_map
+        return self
+
+    def mean_map(self):
+        return self.sum_map / max(self.count, 1)
+
+    def variance_map(self):
+        mean = self.mean_map()
+        return np.maximum(self.sumsq_map / max(self.count, 1) - mean * mean, 0)
+
+    def otsu_threshold(self):
+        # Otsu on the pooled gray histogram, i.e. one threshold for the whole collection
+        return otsu_from_histogram(self.hist[3]) if self.count else 0
+
+    def channel_means(self):
+        totals = self.hist.sum(axis=1)
+        return self.hist @ np.arange(256) / np.maximum(totals, 1)
+
+    def save(self, path, done=(), failed=()):
+        # Written next to the target and renamed, so an interrupted save never corrupts it
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, map_size=np.array(self.map_size), count=self.count, hist=self.hist,
+                     otsu_hist=self.otsu_hist, sum_map=self.sum_map, sumsq_map=self.sumsq_map,
+                     mean_map=self.mean_map(), variance_map=self.variance_map(),
+                     otsu_threshold=self.otsu_threshold(),
+                     done=np.array(sorted(done), dtype=str), failed=np.array(sorted(failed), dtype=str))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            stats = cls(tuple(data['map_size']))
+            stats.count = int(data['count'])
+            stats.hist[:] = data['hist']
+            stats.otsu_hist[:] = data['otsu_hist']
+            stats.sum_map[:] = data['sum_map']
+            stats.sumsq_map[:] = data['sumsq_map']
+            return stats, set(data['done']), set(data['failed'])
+
+def collect_image_paths(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found += [os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS)]
+        else:
+            found.append(path)
+    return sorted(found)
+
+def _analyze_chunk(paths, map_size):
+    # Runs in a worker process; reduces its chunk locally so only sums cross the pipe.
+    # Every file is read once, so nothing is cached.
+    stats, failed = DatasetStats(map_size), []
+    for path in paths:
+        img = read_image(path, cv2.IMREAD_COLOR, cache=None)
+        if img is None:
+            failed.append(path)
+        else:
+            stats.add(img)
+    return stats, failed
+
+def analyze_dataset(paths, checkpoint=None, workers=None, map_size=DATASET_MAP_SIZE,
+                    chunk_size=DATASET_CHUNK_SIZE, progress=None):
+    total, done, failed = DatasetStats(map_size), set(), set()
+    if checkpoint and os.path.exists(checkpoint):
+        total, done, failed = DatasetStats.load(checkpoint)
+        if total.map_size != tuple(map_size):
+            raise ValueError(f"Checkpoint was written with map size {total.map_size}")
+    pending = [p for p in paths if p not in done]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    last_save = time.monotonic()
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(_analyze_chunk, chunk, map_size): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            stats, bad = future.result()
+            total.merge(stats)
+            done.update(futures[future])
+            failed.update(bad)
+            if progress:
+                progress(len(done), len(paths))
+            if checkpoint and time.monotonic() - last_save > DATASET_CHECKPOINT_SECONDS:
+                total.save(checkpoint, done, failed)
+                last_save = time.monotonic()
+    finally:
+        # Also runs on Ctrl+C: drop queued chunks and keep what has been merged so far
+        pool.shutdown(cancel_futures=True)
+        if checkpoint:
+            total.save(checkpoint, done, failed)
+    return total, sorted(failed)
+
+def analyze_main(argv):
+    parser = argparse.ArgumentParser(prog="Project.py analyze",
+                                     description="Aggregate statistics over an image collection")
+    parser.add_argument('paths', nargs='+', help="image files or directories")
+    parser.add_argument('--out', default='dataset_stats.npz', help="results file (also the checkpoint)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--map-size', type=int, nargs=2, default=DATASET_MAP_SIZE, metavar=('H', 'W'))
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+    if args.restart and os.path.exists(args.out):
+        os.remove(args.out)
+    paths = collect_image_paths(args.paths)
+    def progress(done, total):
+        print(f"\r{done}/{total} images", end='', file=sys.stderr, flush=True)
+    start = time.monotonic()
+    stats, failed = analyze_dataset(paths, checkpoint=args.out, workers=args.workers,
+                                    map_size=tuple(args.map_size), progress=progress)
+    elapsed = time.monotonic() - start
+    print(file=sys.stderr)
+    b, g, r, gray = stats.channel_means()
+    print(f"Images: {stats.count} ({len(failed)} unreadable) in {elapsed:.1f}s")
+    print(f"Mean intensity: B={b:.1f} G={g:.1f} R={r:.1f} gray={gray:.1f}")
+    print(f"Dataset Otsu threshold: {stats.otsu_threshold()}")
+    if stats.count:
+        per_image = np.repeat(np.arange(256), stats.otsu_hist)
+        print(f"Per-image Otsu: median={int(np.median(per_image))} "
+              f"p5={int(np.percentile(per_image, 5))} p95={int(np.percentile(per_image, 95))}")
+    print(f"Results written to {args.out}")
+    return 0
+
+# ========== MACROS ==========
+# A macro is a recorded operation chain saved as JSON: the registry names and the
+# parameters each step was applied with. Replay goes through run_chain, so fusable
+# steps are merged and nothing is drawn or kept in history along the way.
+MACRO_VERSION = 1
+
+def save_macro(path, steps):
+    with open(path, 'w') as f:
+        json.dump({'version': MACRO_VERSION,
+                   'steps': [{'op': name, 'params': params} for name, params in steps]}, f, indent=2)
+
+def load_macro(path):
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('version') != MACRO_VERSION:
+        raise ValueError(f"Unsupported macro version: {data.get('version')}")
+    steps = [(step['op'], step['params']) for step in data['steps']]
+    for name, _ in steps:
+        if name not in OPERATIONS or name == 'logic':
+            raise ValueError(f"Operation cannot be replayed: {name}")
+    # Run context is decided at replay time, even if an older file recorded it
+    return [(name, {k: v for k, v in params.items() if k not in OPERATIONS[name].context})
+            for name, params in steps]
+
+def macro_halo(steps):
+    # None when a step needs the whole image to give its full-image result
+    if not all(OPERATIONS[name].roi_exact for name, _ in steps):
+        return None
+    return sum(OPERATIONS[name].halo_for(params) or 0 for name, params in steps)
+
+def macro_align(steps):
+    return int(np.lcm.reduce([OPERATIONS[name].align_for(params) for name, params in steps] or [1]))
+
+def _replay_file(path, steps, out_path):
+    img = read_image(path, cache=None)
+    if img is None:
+        return path, None
+    result = run_chain(img, steps)
+    if not out_path.lower().endswith(('.png', '.tif', '.tiff')):
+        result = to_uint8(result)
+    cv2.imwrite(out_path, result)
+    return path, out_path
+
+def replay_output_paths(paths, out_dir, suffix='_macro'):
+    # Outputs mirror the inputs' folders below their common directory, so files with the
+    # same name in different folders do not overwrite each other
+    if not paths:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    outputs, sources = [], {}
+    for path in paths:
+        stem, ext = os.path.splitext(os.path.relpath(os.path.abspath(path), root))
+        out_path = os.path.join(out_dir, stem + suffix + ext)
+        key = os.path.normcase(os.path.abspath(out_path))
+        if key in sources:
+            raise ValueError(f"{sources[key]} and {path} would both be written to {out_path}")
+        sources[key] = path
+        outputs.append(out_path)
+    return outputs
+
+def replay_files(paths, steps, out_dir, suffix='_macro', workers=None, progress=None):
+    out_paths = replay_output_paths(paths, out_dir, suffix)
+    os.makedirs(out_dir, exist_ok=True)
+    for out_path in out_paths:
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    done, failed = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for path, out_path in zip(paths, out_paths):
+            futures.append(pool.submit(_replay_file, path, steps, out_path))
+        for future in as_completed(futures):
+            path, out_path = future.result()
+            (done if out_path else failed).append(path)
+            if progress:
+                progress(len(done) + len(failed), len(paths))
+    return done, failed
+
+def macro_main(argv):
+    parser = argparse.ArgumentParser(prog="Project.py macro",
+                                     description="Replay a recorded macro over image files")
+    parser.add_argument('macro', help="macro file saved from the editor")
+    parser.add_argument('paths', nargs='+', help="image files or directories")
+    parser.add_argument('--out-dir', default='macro_output')
+    parser.add_argument('--suffix', default='_macro', help="appended to each output file name")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    steps = load_macro(args.macro)
+    paths = collect_image_paths(args.paths)
+    def progress(done, total):
+        print(f"\r{done}/{total} images", end='', file=sys.stderr, flush=True)
+    start = time.monotonic()
+    done, failed = replay_files(paths, steps, args.out_dir, args.suffix, args.workers, progress)
+    print(file=sys.stderr)
+    print(f"Applied {len(steps)} steps to {len(done)} images ({len(failed)} unreadable) "
+          f"in {time.monotonic() - start:.1f}s")
+    for path in failed:
+        print(f"  unreadable: {path}")
+    print(f"Results written to {args.out_dir}")
+    return 0 if not failed else 1
+
 class ImageEditor:
     def __init__(self, root):
         self.root = root
@@ -28,6 +1909,20 @@ class ImageEditor:
         self.selection_rect = None
         self.selection_coords = None
         
+        # Derived data (gray, histograms, spectrum, scale space...) of recent image versions
+        self.image_stats = []
+        # Display conversion buffers, reused across repaints
+        self.buffers = BufferPool()
+        
+        # Seeded watershed painting
+        self.seed_mode = False
+        self.seeded_watershed = None
+        self.seed_source = None
+        self.seed_stroke = []
+        
+        # Steps recorded for a macro, or None when not recording
+        self.macro_steps = None
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -53,6 +1948,19 @@ class ImageEditor:
         edit_menu.add_command(label="↷  Redo               Ctrl+Y", command=self.redo)
         edit_menu.add_separator()
         edit_menu.add_command(label="🔄  Reset to Original", command=self.reset_image)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="🔬  Parameter Sweep...", command=self.open_sweep_dialog)
+        self.process_execution = tk.BooleanVar(value=False)
+        edit_menu.add_checkbutton(label="⚙  Multi-process Execution", variable=self.process_execution,
+                                  command=self.toggle_process_execution)
+        
+        macro_menu = tk.Menu(menubar, tearoff=0, bg='#2b2b2b', fg='white',
+                            activebackground='#404040', activeforeground='white')
+        menubar.add_cascade(label="🎬 Macro", menu=macro_menu)
+        macro_menu.add_command(label="⏺  Start Recording", command=self.start_macro_recording)
+        macro_menu.add_command(label="⏹  Stop && Save...", command=self.stop_macro_recording)
+        macro_menu.add_separator()
+        macro_menu.add_command(label="▶  Play Macro...", command=self.play_macro)
         
         # Top Toolbar
         toolbar = tk.Frame(self.root, bg='#3c3c3c', height=60)
@@ -177,6 +2085,11 @@ class ImageEditor:
         notebook.add(seg_frame, text="Segmentation")
         self.create_segmentation_panel(seg_frame)
         
+        # Morphology Tab
+        morph_frame = tk.Frame(notebook, bg='#353535')
+        notebook.add(morph_frame, text="Morphology")
+        self.create_morphology_panel(morph_frame)
+        
         # Right Panel - Display
         right_panel = tk.Frame(main_frame, bg='#2b2b2b', relief=tk.FLAT)
         right_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -278,6 +2191,38 @@ class ImageEditor:
                  command=self.apply_brightness_contrast,
                  width=20, height=2, **btn_style).pack(pady=10)
 
+        self.create_section_header(container, "Histogram Equalization")
+        tk.Label(container, text="Spread skewed histograms over the\nfull range, globally or per tile (CLAHE).",
+                 bg='#353535', fg='#bbbbbb', font=('Segoe UI', 8), justify=tk.LEFT).pack(anchor=tk.W, pady=(0,10))
+        self.eq_mode = tk.StringVar(value="luminance")
+        rb_style = {'bg': '#353535', 'fg': '#cccccc', 'selectcolor': '#2b2b2b',
+                    'font': ('Segoe UI', 9)}
+        tk.Radiobutton(container, text="Luminance (keeps colors)", variable=self.eq_mode,
+                       value="luminance", **rb_style).pack(anchor=tk.W)
+        tk.Radiobutton(container, text="Each channel", variable=self.eq_mode,
+                       value="channels", **rb_style).pack(anchor=tk.W)
+        small_btn_style = dict(btn_style, font=('Segoe UI', 10, 'bold'))
+        tk.Button(container, text="Equalize Histogram", command=self.apply_equalize_hist,
+                  width=22, **small_btn_style).pack(pady=(8, 10))
+        tk.Label(container, text="CLAHE Clip Limit:", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W)
+        self.clahe_clip = tk.Scale(container, from_=0.5, to=10.0, orient=tk.HORIZONTAL,
+                                   resolution=0.5, bg='#353535', fg='#cccccc',
+                                   troughcolor='#2b2b2b', highlightthickness=0,
+                                   activebackground='#4a90e2', font=('Segoe UI', 8))
+        self.clahe_clip.set(2.0)
+        self.clahe_clip.pack(fill=tk.X)
+        tk.Label(container, text="CLAHE Tile Grid (n×n):", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W)
+        self.clahe_grid = tk.Scale(container, from_=2, to=16, orient=tk.HORIZONTAL,
+                                   bg='#353535', fg='#cccccc',
+                                   troughcolor='#2b2b2b', highlightthickness=0,
+                                   activebackground='#4a90e2', font=('Segoe UI', 8))
+        self.clahe_grid.set(8)
+        self.clahe_grid.pack(fill=tk.X)
+        tk.Button(container, text="Apply CLAHE", command=self.apply_clahe,
+                  width=22, **small_btn_style).pack(pady=8)
+
     # ========== EDGE DETECTION ==========
     def create_edge_panel(self, parent):
         parent.configure(bg='#353535')
@@ -291,6 +2236,34 @@ class ImageEditor:
         tk.Button(container, text="Apply Laplacian", command=self.apply_laplacian_edge,
                  width=22, **edge_btn_style).pack(pady=5)
 
+        self.create_section_header(container, "Multi-Scale Edges")
+        tk.Label(container, text="Edges found on each pyramid octave\nand merged, so coarse and fine\nstructures both show up.",
+                 bg='#353535', fg='#bbbbbb', font=('Segoe UI', 8), justify=tk.LEFT).pack(anchor=tk.W, pady=(0,10))
+        self.edge_method = tk.StringVar(value="sobel")
+        rb_style = {'bg': '#353535', 'fg': '#cccccc', 'selectcolor': '#2b2b2b',
+                    'font': ('Segoe UI', 9)}
+        for label, value in [("Sobel Magnitude", "sobel"), ("Canny", "canny"), ("Laplacian of Gaussian", "log")]:
+            tk.Radiobutton(container, text=label, variable=self.edge_method,
+                           value=value, **rb_style).pack(anchor=tk.W, pady=1)
+        scale_style = {'orient': tk.HORIZONTAL, 'bg': '#353535', 'fg': '#cccccc',
+                       'troughcolor': '#2b2b2b', 'highlightthickness': 0,
+                       'activebackground': '#4a90e2', 'font': ('Segoe UI', 8)}
+        tk.Label(container, text="Pyramid Levels:", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W, pady=(6,0))
+        self.edge_levels = tk.Scale(container, from_=1, to=5, resolution=1, **scale_style)
+        self.edge_levels.set(3)
+        self.edge_levels.pack(fill=tk.X)
+        tk.Label(container, text="Canny Low / High:", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W)
+        self.canny_low = tk.Scale(container, from_=0, to=255, resolution=1, **scale_style)
+        self.canny_low.set(50)
+        self.canny_low.pack(fill=tk.X)
+        self.canny_high = tk.Scale(container, from_=0, to=255, resolution=1, **scale_style)
+        self.canny_high.set(150)
+        self.canny_high.pack(fill=tk.X)
+        tk.Button(container, text="Apply Multi-Scale Edges", command=self.apply_multiscale_edges,
+                 width=22, **edge_btn_style).pack(pady=8)
+
     # ========== THRESHOLDING ==========
     def create_threshold_panel(self, parent):
         parent.configure(bg='#353535')
@@ -346,13 +2319,43 @@ class ImageEditor:
                     'font': ('Segoe UI', 10)}
         tk.Radiobutton(container, text="Patterning (2×2, 5 levels)", 
                        variable=self.halftone_method, value="patterning", **rb_style).pack(anchor=tk.W, pady=4)
-        tk.Radiobutton(container, text="Dithering (2×2 matrix D₁)", 
+        tk.Radiobutton(container, text="Dithering (Bayer ordered)", 
                        variable=self.halftone_method, value="dithering", **rb_style).pack(anchor=tk.W, pady=4)
+        tk.Label(container, text="Bayer Order (2ⁿ×2ⁿ matrix):", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W, padx=(20,0))
+        self.bayer_order = tk.Scale(container, from_=1, to=5, orient=tk.HORIZONTAL,
+                                    resolution=1, bg='#353535', fg='#cccccc',
+                                    troughcolor='#2b2b2b', highlightthickness=0,
+                                    activebackground='#4a90e2', font=('Segoe UI', 8))
+        self.bayer_order.set(1)
+        self.bayer_order.pack(fill=tk.X, padx=(20,0))
+        tk.Radiobutton(container, text="Error Diffusion", 
+                       variable=self.halftone_method, value="diffusion", **rb_style).pack(anchor=tk.W, pady=4)
+        self.diffusion_kernel = tk.StringVar(value="floyd-steinberg")
+        kernel_style = dict(rb_style, font=('Segoe UI', 9))
+        for label, value in [("Floyd–Steinberg", "floyd-steinberg"), ("Jarvis–Judice–Ninke", "jarvis"),
+                             ("Stucki", "stucki"), ("Atkinson", "atkinson")]:
+            tk.Radiobutton(container, text=label, variable=self.diffusion_kernel,
+                           value=value, **kernel_style).pack(anchor=tk.W, padx=(20,0))
+        self.serpentine_scan = tk.BooleanVar(value=False)
+        tk.Checkbutton(container, text="Serpentine scanning", variable=self.serpentine_scan,
+                       **kernel_style).pack(anchor=tk.W, padx=(20,0), pady=(2,0))
         btn_style = {'bg': '#8e44ad', 'fg': 'white', 'font': ('Segoe UI', 10, 'bold'),
                      'relief': tk.FLAT, 'cursor': 'hand2', 'activebackground': '#7d3c98'}
         tk.Button(container, text="🎨 Apply Halftoning", 
                   command=self.apply_halftoning,
                   width=22, **btn_style).pack(pady=15)
+        tk.Label(container, text="Print Scale (output px per image px):", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W)
+        self.export_scale = tk.Scale(container, from_=1, to=16, orient=tk.HORIZONTAL,
+                                     resolution=0.5, bg='#353535', fg='#cccccc',
+                                     troughcolor='#2b2b2b', highlightthickness=0,
+                                     activebackground='#4a90e2', font=('Segoe UI', 8))
+        self.export_scale.set(1)
+        self.export_scale.pack(fill=tk.X)
+        tk.Button(container, text="🖨 Export for Print...", 
+                  command=self.export_halftone,
+                  width=22, **btn_style).pack(pady=(5, 15))
 
     # ========== NEIGHBORHOOD FILTERS ==========
     def create_neighborhood_panel(self, parent):
@@ -368,7 +2371,7 @@ class ImageEditor:
         mean_frame.pack(fill=tk.X, pady=5)
         tk.Label(mean_frame, text="Mean (Box) Kernel:", bg='#353535', fg='#cccccc',
                  font=('Segoe UI', 9)).pack(anchor=tk.W)
-        self.mean_kernel = tk.Scale(mean_frame, from_=3, to=31, orient=tk.HORIZONTAL,
+        self.mean_kernel = tk.Scale(mean_frame, from_=3, to=501, orient=tk.HORIZONTAL,
                                     resolution=2, bg='#353535', fg='#cccccc',
                                     troughcolor='#2b2b2b', highlightthickness=0,
                                     activebackground='#4a90e2', font=('Segoe UI', 8))
@@ -383,7 +2386,7 @@ class ImageEditor:
         gauss_frame.pack(fill=tk.X, pady=10)
         tk.Label(gauss_frame, text="Gaussian Kernel:", bg='#353535', fg='#cccccc',
                  font=('Segoe UI', 9)).pack(anchor=tk.W)
-        self.gauss_kernel = tk.Scale(gauss_frame, from_=3, to=31, orient=tk.HORIZONTAL,
+        self.gauss_kernel = tk.Scale(gauss_frame, from_=3, to=801, orient=tk.HORIZONTAL,
                                      resolution=2, bg='#353535', fg='#cccccc',
                                      troughcolor='#2b2b2b', highlightthickness=0,
                                      activebackground='#4a90e2', font=('Segoe UI', 8))
@@ -391,7 +2394,7 @@ class ImageEditor:
         self.gauss_kernel.pack(fill=tk.X)
         tk.Label(gauss_frame, text="Sigma (σ):", bg='#353535', fg='#cccccc',
                  font=('Segoe UI', 9)).pack(anchor=tk.W, pady=(8,0))
-        self.gauss_sigma = tk.Scale(gauss_frame, from_=0.1, to=5.0, orient=tk.HORIZONTAL,
+        self.gauss_sigma = tk.Scale(gauss_frame, from_=0.1, to=100.0, orient=tk.HORIZONTAL,
                                     resolution=0.1, bg='#353535', fg='#cccccc',
                                     troughcolor='#2b2b2b', highlightthickness=0,
                                     activebackground='#4a90e2', font=('Segoe UI', 8))
@@ -407,7 +2410,7 @@ class ImageEditor:
                  bg='#353535', fg='#bbbbbb', font=('Segoe UI', 8), justify=tk.LEFT).pack(anchor=tk.W, pady=(0,5))
         tk.Label(container, text="Median Kernel (odd):", bg='#353535', fg='#cccccc',
                  font=('Segoe UI', 9)).pack(anchor=tk.W)
-        self.median_kernel = tk.Scale(container, from_=3, to=21, orient=tk.HORIZONTAL,
+        self.median_kernel = tk.Scale(container, from_=3, to=101, orient=tk.HORIZONTAL,
                                       resolution=2, bg='#353535', fg='#cccccc',
                                       troughcolor='#2b2b2b', highlightthickness=0,
                                       activebackground='#4a90e2', font=('Segoe UI', 8))
@@ -466,7 +2469,7 @@ class ImageEditor:
                   bg='#e74c3c', fg='white', font=('Segoe UI', 10, 'bold'),
                   relief=tk.FLAT, cursor='hand2', activebackground='#c0392b').pack(pady=5)
         
-        tk.Label(container, text="Note: Works on grayscale.\nSelection ignored.",
+        tk.Label(container, text="Note: Works on grayscale.\nSelection gets its own spectrum.",
                  bg='#353535', fg='#bbbbbb', font=('Segoe UI', 8), justify=tk.CENTER).pack(pady=(15,0))
 
     # ========== SEGMENTATION ==========
@@ -531,9 +2534,89 @@ class ImageEditor:
                   bg='#8e44ad', fg='white', font=('Segoe UI', 10, 'bold'),
                   relief=tk.FLAT, cursor='hand2', activebackground='#7d3c98').pack(pady=8)
         
-        tk.Label(container, text="Note: Watershed works on\nentire grayscale image.",
+        tk.Label(container, text="Note: Watershed works on the\ngrayscale image or selection.",
                  bg='#353535', fg='#bbbbbb', font=('Segoe UI', 8), justify=tk.CENTER).pack(pady=(10,0))
 
+        self.create_section_header(container, "Seeded Watershed")
+        tk.Label(container, text="Paint foreground/background seeds.\nEach stroke re-segments only the\nbasins it touches.",
+                 bg='#353535', fg='#bbbbbb', font=('Segoe UI', 8), justify=tk.LEFT).pack(anchor=tk.W, pady=(0,5))
+        self.seed_label = tk.IntVar(value=SEED_FOREGROUND)
+        tk.Radiobutton(container, text="Foreground Seeds", variable=self.seed_label,
+                       value=SEED_FOREGROUND, **rb_style).pack(anchor=tk.W, pady=2)
+        tk.Radiobutton(container, text="Background Seeds", variable=self.seed_label,
+                       value=SEED_BACKGROUND, **rb_style).pack(anchor=tk.W, pady=2)
+        tk.Label(container, text="Brush Size:", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W, pady=(8,0))
+        self.seed_brush = tk.Scale(container, from_=1, to=30, orient=tk.HORIZONTAL,
+                                   resolution=1, bg='#353535', fg='#cccccc',
+                                   troughcolor='#2b2b2b', highlightthickness=0,
+                                   activebackground='#4a90e2', font=('Segoe UI', 8))
+        self.seed_brush.set(4)
+        self.seed_brush.pack(fill=tk.X, pady=(0,8))
+        self.seed_btn = tk.Button(container, text="🖌 Paint Seeds",
+                                  command=self.toggle_seed_mode,
+                                  bg='#4a90e2', fg='white', font=('Segoe UI', 10, 'bold'),
+                                  relief=tk.FLAT, cursor='hand2', activebackground='#357abd')
+        self.seed_btn.pack(pady=5)
+        tk.Button(container, text="✓ Apply Seeded Watershed",
+                  command=self.apply_seeded_watershed,
+                  bg='#8e44ad', fg='white', font=('Segoe UI', 10, 'bold'),
+                  relief=tk.FLAT, cursor='hand2', activebackground='#7d3c98').pack(pady=5)
+        tk.Button(container, text="Clear Seeds",
+                  command=self.clear_seeds,
+                  bg='#2c3e50', fg='white', font=('Segoe UI', 9),
+                  relief=tk.FLAT, cursor='hand2', activebackground='#1a252f').pack(pady=5)
+
+    # ========== MORPHOLOGY ==========
+    def create_morphology_panel(self, parent):
+        parent.configure(bg='#353535')
+        container = tk.Frame(parent, bg='#353535')
+        container.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+        
+        self.create_section_header(container, "Morphological Operations")
+        tk.Label(container, text="Shape-based filtering with a\nstructuring element (SE). Runtime does\nnot grow with large SE sizes.",
+                 bg='#353535', fg='#bbbbbb', font=('Segoe UI', 8), justify=tk.LEFT).pack(anchor=tk.W, pady=(0,5))
+        self.morph_op = tk.StringVar(value="erode")
+        rb_style = {'bg': '#353535', 'fg': '#cccccc', 'selectcolor': '#2b2b2b',
+                    'font': ('Segoe UI', 9)}
+        for label, value in [("Erode", "erode"), ("Dilate", "dilate"), ("Open", "open"),
+                             ("Close", "close"), ("Top-Hat", "tophat"), ("Gradient", "gradient")]:
+            tk.Radiobutton(container, text=label, variable=self.morph_op,
+                           value=value, **rb_style).pack(anchor=tk.W, pady=1)
+        
+        self.create_section_status(container, "Structuring Element")
+        self.morph_shape = tk.StringVar(value="rect")
+        tk.Radiobutton(container, text="Rectangle (W×H)", variable=self.morph_shape,
+                       value="rect", **rb_style).pack(anchor=tk.W, pady=1)
+        tk.Radiobutton(container, text="Line (length W)", variable=self.morph_shape,
+                       value="line", **rb_style).pack(anchor=tk.W, pady=1)
+        scale_style = {'orient': tk.HORIZONTAL, 'bg': '#353535', 'fg': '#cccccc',
+                       'troughcolor': '#2b2b2b', 'highlightthickness': 0,
+                       'activebackground': '#4a90e2', 'font': ('Segoe UI', 8)}
+        tk.Label(container, text="Width / Length:", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W, pady=(6,0))
+        self.morph_width = tk.Scale(container, from_=1, to=501, resolution=2, **scale_style)
+        self.morph_width.set(3)
+        self.morph_width.pack(fill=tk.X)
+        tk.Label(container, text="Height:", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W)
+        self.morph_height = tk.Scale(container, from_=1, to=501, resolution=2, **scale_style)
+        self.morph_height.set(3)
+        self.morph_height.pack(fill=tk.X)
+        tk.Label(container, text="Line Angle:", bg='#353535', fg='#cccccc',
+                 font=('Segoe UI', 9)).pack(anchor=tk.W)
+        self.morph_angle = tk.IntVar(value=0)
+        angle_frame = tk.Frame(container, bg='#353535')
+        angle_frame.pack(fill=tk.X)
+        for angle in (0, 45, 90, 135):
+            tk.Radiobutton(angle_frame, text=f"{angle}°", variable=self.morph_angle,
+                           value=angle, **rb_style).pack(side=tk.LEFT)
+        
+        tk.Button(container, text="⬛ Apply Morphology", 
+                  command=self.apply_morphology,
+                  bg='#16a085', fg='white', font=('Segoe UI', 10, 'bold'),
+                  relief=tk.FLAT, cursor='hand2', activebackground='#138d75').pack(pady=12)
+
     def update_brightness_label(self, value):
         self.brightness_value.config(text=f"{int(float(value))}")
     def update_contrast_label(self, value):
@@ -559,12 +2642,16 @@ class ImageEditor:
         self.update_status("✓ Selection cleared")
         self.display_image()
     def on_mouse_down(self, event):
+        if self.seed_mode:
+            return self.start_seed_stroke(event)
         if not self.selection_active or self.current_image is None:
             return
         self.selection_start = (event.x, event.y)
         if self.selection_rect:
             self.canvas.delete(self.selection_rect)
     def on_mouse_drag(self, event):
+        if self.seed_mode:
+            return self.extend_seed_stroke(event)
         if not self.selection_active or self.selection_start is None:
             return
         if self.selection_rect:
@@ -578,6 +2665,8 @@ class ImageEditor:
             dash=(5, 5)
         )
     def on_mouse_up(self, event):
+        if self.seed_mode:
+            return self.finish_seed_stroke(event)
         if not self.selection_active or self.selection_start is None:
             return
         self.selection_end = (event.x, event.y)
@@ -616,67 +2705,206 @@ class ImageEditor:
         if y1_img > y2_img:
             y1_img, y2_img = y2_img, y1_img
         self.selection_coords = (x1_img, y1_img, x2_img, y2_img)
-    def apply_to_selection(self, operation_func):
+    def canvas_transform(self):
+        # (scale, offset_x, offset_y) of the displayed image, as display_image lays it out
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        img_h, img_w = self.current_image.shape[:2]
+        scale = min(canvas_width/img_w, canvas_height/img_h, 1.0)
+        return scale, (canvas_width - int(img_w * scale)) // 2, (canvas_height - int(img_h * scale)) // 2
+
+    # ========== SEEDED WATERSHED ==========
+    def toggle_seed_mode(self):
+        if self.current_image is None:
+            messagebox.showwarning("Warning", "Please load an image first")
+            return
+        self.seed_mode = not self.seed_mode
+        if self.seed_mode:
+            if self.selection_active:
+                self.toggle_selection_mode()
+            self.seed_btn.config(bg='#27ae60', text='🖌 Painting ON')
+            self.update_status("🖌 Seed mode: paint foreground and background seeds")
+        else:
+            self.seed_btn.config(bg='#4a90e2', text='🖌 Paint Seeds')
+            self.update_status("Seed mode disabled")
+        self.display_image()
+    def start_seed_stroke(self, event):
+        if self.current_image is None:
+            return
+        if self.seeded_watershed is None or self.seed_source is not self.current_image:
+            self.seeded_watershed = SeededWatershed(self.current_image)
+            self.seed_source = self.current_image
+        self.seed_stroke = [(event.x, event.y)]
+    def extend_seed_stroke(self, event):
+        if not self.seed_stroke:
+            return
+        x0, y0 = self.seed_stroke[-1]
+        self.seed_stroke.append((event.x, event.y))
+        color = '#00ff00' if self.seed_label.get() == SEED_FOREGROUND else '#0080ff'
+        self.canvas.create_line(x0, y0, event.x, event.y, fill=color,
+                                width=2 * int(self.seed_brush.get()) + 1, capstyle=tk.ROUND)
+    def finish_seed_stroke(self, event):
+        if not self.seed_stroke:
+            return
+        scale, offset_x, offset_y = self.canvas_transform()
+        points = [(int((x - offset_x) / scale), int((y - offset_y) / scale)) for x, y in self.seed_stroke]
+        radius = max(1, int(int(self.seed_brush.get()) / scale))
+        self.seed_stroke = []
+        label = self.seed_label.get()
+        watershed = self.seeded_watershed
+        window = watershed.add_stroke(points, radius, label)
+        self.display_image()
+        if watershed.labels is None:
+            self.update_status("🖌 Paint both foreground and background seeds to segment")
+        elif window is not None:
+            y0, y1, x0, x1 = window
+            self.update_status(f"✓ Re-segmented {x1 - x0}×{y1 - y0}px around the stroke")
+            if not watershed.exact:
+                future = _get_executor_pool().submit(watershed.full_run())
+                self.root.after(WATERSHED_POLL_MS, self.settle_seeded_watershed, watershed, future)
+    def settle_seeded_watershed(self, watershed, future):
+        # Swaps the stroke preview for the full watershed once it is done
+        if not future.done():
+            self.root.after(WATERSHED_POLL_MS, self.settle_seeded_watershed, watershed, future)
+            return
+        if watershed is self.seeded_watershed and watershed.settle(*future.result()):
+            self.display_image()
+            self.update_status("✓ Seeded watershed updated over the whole image")
+    def apply_seeded_watershed(self):
+        if self.seeded_watershed is None or self.seeded_watershed.labels is None \
+                or self.seed_source is not self.current_image:
+            messagebox.showwarning("Warning", "Please paint foreground and background seeds first")
+            return
+        self.current_image = self.seeded_watershed.result()
+        self.seeded_watershed = self.seed_source = None
+        self.seed_mode = False
+        self.seed_btn.config(bg='#4a90e2', text='🖌 Paint Seeds')
+        self.add_to_history()
+        self.display_image()
+        self.update_status("✓ Seeded watershed segmentation applied")
+
+    def clear_seeds(self):
+        self.seeded_watershed = None
+        self.seed_source = None
+        self.seed_stroke = []
+        self.display_image()
+
+    def apply_to_selection(self, operation_func, halo=0, align=1):
+        # Runs the operation on the selection grown by `halo` pixels of real context
+        # (clipped to the image; None for the whole image), then composites only the
+        # selected rectangle back.
+        # The crop is a read-only view of the current version.
+        region, crop = self.crop_selection(halo, align)
+        return self.composite_selection(operation_func(region), crop)
+    def crop_selection(self, halo=0, align=1):
         if self.selection_coords is None:
-            return operation_func(self.current_image)
+            return self.current_image, None
         x1, y1, x2, y2 = self.selection_coords
-        selected_region = self.current_image[y1:y2, x1:x2].copy()
-        processed_region = operation_func(selected_region)
-        result = self.current_image.copy()
+        img_h, img_w = self.current_image.shape[:2]
+        if halo is None:
+            halo = max(img_h, img_w)
+        cx1, cy1 = max(0, x1 - halo), max(0, y1 - halo)
+        cx1, cy1 = cx1 - cx1 % align, cy1 - cy1 % align
+        cx2, cy2 = min(img_w, x2 + halo), min(img_h, y2 + halo)
+        return self.current_image[cy1:cy2, cx1:cx2], (cx1, cy1)
+    def composite_selection(self, processed_region, crop, image=None, selection=None):
+        # image/selection default to the live ones; deferred callers pass what they cropped from
+        if crop is None:
+            return processed_region
+        image = self.current_image if image is None else image
+        x1, y1, x2, y2 = self.selection_coords if selection is None else selection
+        cx1, cy1 = crop
+        processed_region = processed_region[y1 - cy1:y2 - cy1, x1 - cx1:x2 - cx1]
+        # A gray result inside a color image is expanded; a color result inside a
+        # gray image promotes the whole image to color
+        if len(image.shape) == 2 and len(processed_region.shape) == 3:
+            result = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        else:
+            result = image.copy()
+            if len(result.shape) == 3 and len(processed_region.shape) == 2:
+                processed_region = cv2.cvtColor(processed_region, cv2.COLOR_GRAY2BGR)
         result[y1:y2, x1:x2] = processed_region
         return result
 
+    def get_image_stats(self, img):
+        for stats in self.image_stats:
+            if stats.image is img:
+                return stats
+        stats = ImageStats(img)
+        # Only whole image versions are worth keeping; selection crops are one-off views
+        if img is self.current_image:
+            self.image_stats = [stats] + self.image_stats[:IMAGE_STATS_CACHE_SIZE - 1]
+        return stats
+
     # ========== FILE OPERATIONS ==========
     def open_image(self):
         file_path = filedialog.askopenfilename(
             title="Select Image",
-            filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp *.tiff"),
+            filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp *.tif *.tiff"),
                       ("All Files", "*.*")]
         )
         if file_path:
-            self.original_image = cv2.imread(file_path)
-            if self.original_image is not None:
-                self.current_image = self.original_image.copy()
-                self.history = [self.current_image.copy()]
-                self.history_index = 0
-                self.second_image = None
-                if hasattr(self, 'second_img_label'):
-                    self.second_img_label.config(text="No second image")
-                self.canvas.delete('placeholder')
-                self.display_image()
-                h, w = self.current_image.shape[:2]
-                filename = file_path.split('/')[-1]
-                self.img_info_label.config(text=f"📷 {filename} ({w}x{h}px)")
-                self.update_status(f"✓ Loaded: {filename}")
+            # Keeps 16-bit and float data instead of letting imread truncate it to 8-bit
+            img = read_image(file_path)
+            if img is not None:
+                self.load_image(img, file_path.split('/')[-1])
             else:
                 messagebox.showerror("Error", "Failed to load image")
+    def load_image(self, img, filename):
+        self.original_image = freeze(img)
+        self.current_image = self.original_image
+        self.history = [self.pack_current()]
+        self.history_index = 0
+        self.second_image = None
+        if hasattr(self, 'second_img_label'):
+            self.second_img_label.config(text="No second image")
+        self.canvas.delete('placeholder')
+        self.display_image()
+        h, w = self.current_image.shape[:2]
+        self.img_info_label.config(text=f"📷 {filename} ({w}x{h}px)")
+        self.update_status(f"✓ Loaded: {filename}")
     def save_image(self):
         if self.current_image is None:
             messagebox.showwarning("Warning", "No image to save")
             return
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG", "*.png"), ("JPEG", "*.jpg"), 
+            filetypes=[("PNG", "*.png"), ("TIFF", "*.tif"), ("JPEG", "*.jpg"), 
                       ("BMP", "*.bmp"), ("All Files", "*.*")]
         )
         if file_path:
-            cv2.imwrite(file_path, self.current_image)
+            img = self.current_image
+            if not file_path.lower().endswith(('.png', '.tif', '.tiff')):
+                img = to_uint8(img)
+            cv2.imwrite(file_path, img)
             filename = file_path.split('/')[-1]
             self.update_status(f"💾 Saved: {filename}")
             messagebox.showinfo("Success", f"Image saved successfully!\n\n{filename}")
 
     # ========== HISTORY ==========
+    # History entries are the image versions themselves (binary ones bit-packed);
+    # versions are frozen, so no defensive copies are needed.
+    @property
+    def current_image(self):
+        return self._current_image
+    @current_image.setter
+    def current_image(self, img):
+        # Every committed version is frozen, so it can be shared without copies
+        self._current_image = freeze(img)
     def add_to_history(self):
         self.history = self.history[:self.history_index + 1]
-        self.history.append(self.current_image.copy())
+        self.history.append(self.pack_current())
         self.history_index += 1
         if len(self.history) > 20:
             self.history.pop(0)
             self.history_index -= 1
+    def pack_current(self):
+        stats = self.get_image_stats(self.current_image)
+        return pack_for_history(self.current_image, stats.is_binary())
     def undo(self):
         if self.history_index > 0:
             self.history_index -= 1
-            self.current_image = self.history[self.history_index].copy()
+            self.current_image = unpack_from_history(self.history[self.history_index])
             self.display_image()
             self.update_status("↶ Undo applied")
         else:
@@ -684,14 +2912,14 @@ class ImageEditor:
     def redo(self):
         if self.history_index < len(self.history) - 1:
             self.history_index += 1
-            self.current_image = self.history[self.history_index].copy()
+            self.current_image = unpack_from_history(self.history[self.history_index])
             self.display_image()
             self.update_status("↷ Redo applied")
         else:
             self.update_status("⚠️ No more actions to redo")
     def reset_image(self):
         if self.original_image is not None:
-            self.current_image = self.original_image.copy()
+            self.current_image = self.original_image
             self.second_image = None
             if hasattr(self, 'second_img_label'):
                 self.second_img_label.config(text="No second image")
@@ -709,7 +2937,7 @@ class ImageEditor:
         kernel_size = self.blur_scale.get()
         if kernel_size % 2 == 0: kernel_size += 1
         def blur_operation(img): return cv2.GaussianBlur(img, (kernel_size, kernel_size), 0)
-        self.current_image = self.apply_to_selection(blur_operation)
+        self.current_image = self.apply_to_selection(blur_operation, halo=kernel_size // 2)
         self.add_to_history()
         self.display_image()
         region_text = " to selected region" if self.selection_coords else ""
@@ -718,8 +2946,8 @@ class ImageEditor:
         if self.current_image is None: return
         kernel_size = self.blur_scale.get()
         if kernel_size % 2 == 0: kernel_size += 1
-        def blur_operation(img): return cv2.medianBlur(img, kernel_size)
-        self.current_image = self.apply_to_selection(blur_operation)
+        def blur_operation(img): return median_filter(img, kernel_size)
+        self.current_image = self.apply_to_selection(blur_operation, halo=kernel_size // 2)
         self.add_to_history()
         self.display_image()
         region_text = " to selected region" if self.selection_coords else ""
@@ -729,67 +2957,126 @@ class ImageEditor:
         kernel_size = self.blur_scale.get()
         if kernel_size % 2 == 0: kernel_size += 1
         def blur_operation(img): return cv2.blur(img, (kernel_size, kernel_size))
-        self.current_image = self.apply_to_selection(blur_operation)
+        self.current_image = self.apply_to_selection(blur_operation, halo=kernel_size // 2)
         self.add_to_history()
         self.display_image()
         region_text = " to selected region" if self.selection_coords else ""
         self.update_status(f"✓ Mean Blur applied{region_text} (kernel: {kernel_size}x{kernel_size})")
-    def apply_brightness_contrast(self):
-        if self.current_image is None: return
-        brightness = self.brightness_scale.get()
-        contrast = self.contrast_scale.get()
-        def adjust_operation(img):
-            img_float = img.astype(np.float32)
-            scaled = cv2.multiply(img_float, contrast)
-            adjusted = cv2.add(scaled, brightness)
-            clipped = np.clip(adjusted, 0, 255)
-            return clipped.astype(np.uint8)
-        self.current_image = self.apply_to_selection(adjust_operation)
-        self.add_to_history()
-        self.display_image()
-        region_text = " to selected region" if self.selection_coords else ""
-        self.update_status(f"Adjusted{region_text}: Brightness={brightness}, Contrast={contrast}")
-    def apply_laplacian_edge(self):
+    def toggle_process_execution(self):
+        executor = set_process_execution(self.process_execution.get())
+        if executor is not None:
+            self.update_status(f"✓ Multi-process execution on ({executor.workers} workers)")
+        else:
+            self.update_status("✓ Multi-process execution off")
+    def start_macro_recording(self):
+        self.macro_steps = []
+        self.update_status("⏺ Recording macro: apply operations, then Macro → Stop & Save")
+    def stop_macro_recording(self):
+        if self.macro_steps is None:
+            messagebox.showwarning("Warning", "No macro is being recorded")
+            return
+        if not self.macro_steps:
+            self.macro_steps = None
+            self.update_status("⏹ Macro recording stopped (no steps recorded)")
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Macro", "*.json"), ("All Files", "*.*")]
+        )
+        if not file_path:
+            return
+        save_macro(file_path, self.macro_steps)
+        count = len(self.macro_steps)
+        self.macro_steps = None
+        self.update_status(f"💾 Macro saved: {file_path.split('/')[-1]} ({count} steps)")
+    def play_macro(self):
         if self.current_image is None:
             messagebox.showwarning("Warning", "Please load an image first")
             return
-        def edge_operation(img):
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img
-            lap = cv2.Laplacian(gray, cv2.CV_16S, ksize=3)
-            lap = cv2.convertScaleAbs(lap)
-            return cv2.cvtColor(lap, cv2.COLOR_GRAY2BGR)
-        self.current_image = self.apply_to_selection(edge_operation)
+        file_path = filedialog.askopenfilename(
+            title="Select Macro",
+            filetypes=[("Macro", "*.json"), ("All Files", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            steps = load_macro(file_path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Failed to load macro\n\n{e}")
+            return
+        self.apply_macro(steps)
+    def apply_macro(self, steps):
+        # The whole chain is one edit: a single history entry and a single redraw
+        context = self.run_context()
+        self.current_image = self.apply_to_selection(lambda img: run_chain(img, steps, context=context),
+                                                     halo=macro_halo(steps), align=macro_align(steps))
         self.add_to_history()
         self.display_image()
+        if self.macro_steps is not None:
+            self.macro_steps.extend(steps)
         region_text = " to selected region" if self.selection_coords else ""
-        self.update_status(f"✓ Laplacian Edge applied{region_text}")
-    def apply_otsu_threshold(self):
+        self.update_status(f"✓ Macro applied ({len(steps)} steps){region_text}")
+    def ensure_8bit(self):
+        if self.current_image.dtype == np.uint8:
+            return ""
+        self.current_image = to_uint8(self.current_image)
+        return " (converted to 8-bit)"
+    def run_context(self):
+        return {'keep_size': self.selection_coords is not None}
+    def run_operation(self, name, **extra):
         if self.current_image is None:
             messagebox.showwarning("Warning", "Please load an image first")
             return
-        def threshold_operation(img):
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img
-            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            return cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
-        self.current_image = self.apply_to_selection(threshold_operation)
+        op = OPERATIONS[name]
+        params = op.read_params(self)
+        run_params = dict(op.with_context(params, self.run_context()), **extra)
+        depth_note = "" if self.current_image.dtype.type in op.depths else self.ensure_8bit()
+        def operation(img):
+            return execute_operation(op, self.get_image_stats(img), run_params)
+        if _shared_executor is not None:
+            _shared_executor.last_timings = []
+        halo = (op.halo_for(params) or 0) if op.roi_exact else None
+        self.current_image = self.apply_to_selection(operation, halo=halo, align=op.align_for(params))
         self.add_to_history()
         self.display_image()
         region_text = " to selected region" if self.selection_coords else ""
-        self.update_status(f"✓ Otsu Threshold applied{region_text}")
+        message = op.describe(run_params, region_text) + depth_note
+        if _shared_executor is not None and _shared_executor.last_timings:
+            message += f" · {_shared_executor.report()}"
+        if self.macro_steps is not None:
+            if name == 'logic':
+                message += " · not recorded (needs the second image)"
+            else:
+                self.macro_steps.append((name, params))
+                message += f" · ⏺ step {len(self.macro_steps)}"
+        self.update_status(message)
+    def apply_brightness_contrast(self):
+        self.run_operation('brightness_contrast')
+    def apply_equalize_hist(self):
+        self.run_operation('equalize_hist')
+    def apply_clahe(self):
+        self.run_operation('clahe')
+    def apply_laplacian_edge(self):
+        self.run_operation('laplacian_edge')
+    def apply_multiscale_edges(self):
+        self.run_operation('multiscale_edges')
+    def apply_otsu_threshold(self):
+        self.run_operation('otsu_threshold')
     def load_second_image(self):
         if self.current_image is None:
             messagebox.showwarning("Warning", "Please load a main image first!")
             return
         file_path = filedialog.askopenfilename(
             title="Select Second Image",
-            filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp *.tiff"),
+            filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp *.tif *.tiff"),
                        ("All Files", "*.*")]
         )
         if file_path:
-            img = cv2.imread(file_path)
+            h1, w1 = self.current_image.shape[:2]
+            # Cached per target size, so switching between recent masks skips decode and resize
+            img = read_image(file_path, cv2.IMREAD_COLOR, size=(w1, h1))
             if img is not None:
-                h1, w1 = self.current_image.shape[:2]
-                self.second_image = cv2.resize(img, (w1, h1))
+                self.second_image = img
                 filename = file_path.split('/')[-1]
                 self.second_img_label.config(text=f"✓ {filename}")
                 self.update_status(f"✓ Second image loaded: {filename}")
@@ -804,273 +3091,181 @@ class ImageEditor:
         if self.second_image is None:
             messagebox.showwarning("Warning", "Please load a second image first!")
             return
+        if op not in LOGIC_OPS:
+            return
+        other = self.second_image
+        if self.selection_coords is not None:
+            x1, y1, x2, y2 = self.selection_coords
+            other = other[y1:y2, x1:x2]
         try:
-            if op == 'AND':
-                result = cv2.bitwise_and(self.current_image, self.second_image)
-                msg = "BitFields AND applied"
-            elif op == 'OR':
-                result = cv2.bitwise_or(self.current_image, self.second_image)
-                msg = "BitFields OR applied"
-            elif op == 'XOR':
-                result = cv2.bitwise_xor(self.current_image, self.second_image)
-                msg = "BitFields XOR applied"
-            else:
-                return
-            self.current_image = result
-            self.add_to_history()
-            self.display_image()
-            self.update_status(f"✓ {msg}")
+            self.run_operation('logic', op=op, other=other)
         except Exception as e:
             messagebox.showerror("Error", f"Logical operation failed:\n{str(e)}")
 
     # ========== HALFTONING METHODS ==========
     def apply_halftoning(self):
+        if self.halftone_method.get() not in ("patterning", "dithering", "diffusion"):
+            return
+        self.run_operation('halftone')
+    def export_halftone(self):
         if self.current_image is None:
             messagebox.showwarning("Warning", "Please load an image first")
             return
-        if len(self.current_image.shape) == 3:
-            gray = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = self.current_image.copy()
-        method = self.halftone_method.get()
-        if method == "patterning":
-            result = self._apply_patterning(gray)
-            msg = "Patterning halftoning applied"
-        elif method == "dithering":
-            result = self._apply_dithering(gray)
-            msg = "Dithering halftoning applied"
-        else:
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".tif",
+            filetypes=[("1-bit TIFF (CCITT G4)", "*.tif"), ("PBM", "*.pbm"), ("All Files", "*.*")]
+        )
+        if not file_path:
             return
-        self.current_image = cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
-        self.add_to_history()
-        self.display_image()
-        self.update_status(f"✓ {msg}")
-    def _apply_patterning(self, gray_img):
-        h, w = gray_img.shape
-        fonts = [
-            np.array([[0, 0], [0, 0]], dtype=np.uint8),
-            np.array([[0, 1], [0, 0]], dtype=np.uint8),
-            np.array([[0, 1], [1, 0]], dtype=np.uint8),
-            np.array([[1, 1], [0, 1]], dtype=np.uint8),
-            np.array([[1, 1], [1, 1]], dtype=np.uint8),
-        ]
-        levels = np.digitize(gray_img, bins=[51, 102, 153, 204], right=False)
-        out = np.zeros((h * 2, w * 2), dtype=np.uint8)
-        for i in range(h):
-            for j in range(w):
-                lvl = levels[i, j]
-                out[i*2:(i+1)*2, j*2:(j+1)*2] = fonts[lvl]
-        return out * 255
-    def _apply_dithering(self, gray_img):
-        dither_matrix = np.array([[0, 128], [192, 64]], dtype=np.uint8)
-        h, w = gray_img.shape
-        tiled = np.tile(dither_matrix, (int(np.ceil(h/2)), int(np.ceil(w/2))))
-        threshold_map = tiled[:h, :w]
-        binary = (gray_img > threshold_map).astype(np.uint8) * 255
-        return binary
+        p = OPERATIONS['halftone'].read_params(self)
+        scale = float(self.export_scale.get())
+        w, h = export_halftone(self.get_image_stats(self.current_image).gray(), file_path, scale,
+                               p['method'], p['order'], p['kernel'], p['serpentine'])
+        filename = file_path.split('/')[-1]
+        self.update_status(f"🖨 Exported {w}×{h}px halftone: {filename}")
 
     # ========== NEIGHBORHOOD METHODS ==========
     def apply_mean_filter(self):
-        if self.current_image is None:
-            messagebox.showwarning("Warning", "Please load an image first")
-            return
-        k = int(self.mean_kernel.get())
-        if k % 2 == 0: k += 1
-        def op(img): return cv2.blur(img, (k, k))
-        self.current_image = self.apply_to_selection(op)
-        self.add_to_history()
-        self.display_image()
-        region = " to selection" if self.selection_coords else ""
-        self.update_status(f"✓ Mean blur ({k}×{k}) applied{region}")
+        self.run_operation('mean_filter')
 
     def apply_gaussian_filter(self):
-        if self.current_image is None:
-            messagebox.showwarning("Warning", "Please load an image first")
-            return
-        k = int(self.gauss_kernel.get())
-        if k % 2 == 0: k += 1
-        sigma = float(self.gauss_sigma.get())
-        def op(img): return cv2.GaussianBlur(img, (k, k), sigmaX=sigma, sigmaY=sigma)
-        self.current_image = self.apply_to_selection(op)
-        self.add_to_history()
-        self.display_image()
-        region = " to selection" if self.selection_coords else ""
-        self.update_status(f"✓ Gaussian blur ({k}×{k}, σ={sigma}) applied{region}")
+        self.run_operation('gaussian_filter')
 
     def apply_median_filter(self):
-        if self.current_image is None:
-            messagebox.showwarning("Warning", "Please load an image first")
-            return
-        k = int(self.median_kernel.get())
-        if k % 2 == 0: k += 1
-        def op(img): return cv2.medianBlur(img, k)
-        self.current_image = self.apply_to_selection(op)
-        self.add_to_history()
-        self.display_image()
-        region = " to selection" if self.selection_coords else ""
-        self.update_status(f"✓ Median filter ({k}×{k}) applied{region}")
+        self.run_operation('median_filter')
 
     def apply_sharpen_laplacian(self):
-        if self.current_image is None:
-            messagebox.showwarning("Warning", "Please load an image first")
-            return
-        def op(img):
-            if len(img.shape) == 3:
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                lap = cv2.Laplacian(gray, cv2.CV_16S, ksize=3)
-                lap = cv2.convertScaleAbs(lap)
-                sharpened_gray = cv2.addWeighted(gray, 1.5, lap, -0.5, 0)
-                return cv2.cvtColor(sharpened_gray, cv2.COLOR_GRAY2BGR)
-            else:
-                lap = cv2.Laplacian(img, cv2.CV_16S, ksize=3)
-                lap = cv2.convertScaleAbs(lap)
-                return cv2.addWeighted(img, 1.5, lap, -0.5, 0)
-        self.current_image = self.apply_to_selection(op)
-        self.add_to_history()
-        self.display_image()
-        region = " to selection" if self.selection_coords else ""
-        self.update_status(f"✓ Laplacian sharpening applied{region}")
+        self.run_operation('sharpen_laplacian')
 
     def apply_unsharp_mask(self):
-        if self.current_image is None:
-            messagebox.showwarning("Warning", "Please load an image first")
-            return
-        def op(img):
-            blurred = cv2.GaussianBlur(img, (0, 0), sigmaX=1.0)
-            sharpened = cv2.addWeighted(img, 1.5, blurred, -0.5, 0)
-            return np.clip(sharpened, 0, 255).astype(np.uint8)
-        self.current_image = self.apply_to_selection(op)
-        self.add_to_history()
-        self.display_image()
-        region = " to selection" if self.selection_coords else ""
-        self.update_status(f"✓ Unsharp masking applied{region}")
+        self.run_operation('unsharp_mask')
 
     # ========== FREQUENCY DOMAIN METHODS ==========
     def show_fft_magnitude(self):
         if self.current_image is None:
             messagebox.showwarning("Warning", "Please load an image first")
             return
-        if len(self.current_image.shape) == 3:
-            gray = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = self.current_image.copy()
-        f = np.fft.fft2(gray.astype(np.float32))
-        fshift = np.fft.fftshift(f)
-        magnitude = np.log(1 + np.abs(fshift))
-        magnitude = ((magnitude - magnitude.min()) / (magnitude.max() - magnitude.min()) * 255).astype(np.uint8)
+        magnitude = self.get_image_stats(self.current_image).fft_magnitude()
         cv2.imshow("FFT Magnitude Spectrum", magnitude)
         cv2.waitKey(0)
         cv2.destroyAllWindows()
 
     def apply_ideal_lowpass(self):
-        self._apply_freq_filter('lowpass')
+        self.run_operation('ideal_lowpass')
 
     def apply_ideal_highpass(self):
-        self._apply_freq_filter('highpass')
-
-    def _apply_freq_filter(self, filter_type):
-        if self.current_image is None:
-            messagebox.showwarning("Warning", "Please load an image first")
-            return
-        if self.selection_coords is not None:
-            messagebox.showinfo("Info", "Frequency filters ignore selection.\nApplying to entire image.")
-        if len(self.current_image.shape) == 3:
-            gray = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = self.current_image.copy().astype(np.float32)
-        D0 = int(self.cutoff_scale.get())
-        rows, cols = gray.shape
-        crow, ccol = rows // 2, cols // 2
-        f = np.fft.fft2(gray)
-        fshift = np.fft.fftshift(f)
-        mask = np.zeros((rows, cols), dtype=np.float32)
-        for i in range(rows):
-            for j in range(cols):
-                D = np.sqrt((i - crow)**2 + (j - ccol)**2)
-                if filter_type == 'lowpass':
-                    if D <= D0:
-                        mask[i, j] = 1
-                else:
-                    if D > D0:
-                        mask[i, j] = 1
-        f_filtered = fshift * mask
-        f_ishift = np.fft.ifftshift(f_filtered)
-        img_back = np.fft.ifft2(f_ishift)
-        img_back = np.abs(img_back)
-        img_back = np.clip(img_back, 0, 255).astype(np.uint8)
-        self.current_image = cv2.cvtColor(img_back, cv2.COLOR_GRAY2BGR)
-        self.add_to_history()
-        self.display_image()
-        self.update_status(f"✓ Ideal {'LPF' if filter_type == 'lowpass' else 'HPF'} applied (D₀={D0})")
+        self.run_operation('ideal_highpass')
 
     # ========== SEGMENTATION METHODS ==========
     def apply_global_threshold(self):
-        if self.current_image is None:
-            messagebox.showwarning("Warning", "Please load an image first")
-            return
-        if len(self.current_image.shape) == 3:
-            gray = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = self.current_image.copy()
-        thresh_val = int(self.global_thresh.get())
-        _, binary = cv2.threshold(gray, thresh_val, 255, cv2.THRESH_BINARY)
-        self.current_image = cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
-        self.add_to_history()
-        self.display_image()
-        self.update_status(f"✓ Global threshold applied (T={thresh_val})")
+        self.run_operation('global_threshold')
 
     def apply_adaptive_threshold(self):
-        if self.current_image is None:
-            messagebox.showwarning("Warning", "Please load an image first")
-            return
-        if len(self.current_image.shape) == 3:
-            gray = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = self.current_image.copy()
-        block = int(self.block_size.get())
-        if block % 2 == 0:
-            block += 1
-        c = 2
-        if self.adaptive_method.get() == "gaussian":
-            binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                          cv2.THRESH_BINARY, block, c)
-        else:
-            binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
-                                          cv2.THRESH_BINARY, block, c)
-        self.current_image = cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
-        self.add_to_history()
-        self.display_image()
-        method_name = "Gaussian" if self.adaptive_method.get() == "gaussian" else "Mean"
-        self.update_status(f"✓ Adaptive {method_name} threshold applied (block={block})")
+        self.run_operation('adaptive_threshold')
 
     def apply_watershed_segmentation(self):
+        self.run_operation('watershed')
+
+    # ========== MORPHOLOGY METHODS ==========
+    def apply_morphology(self):
+        self.run_operation('morphology')
+
+    # ========== PARAMETER SWEEP ==========
+    def open_sweep_dialog(self):
         if self.current_image is None:
             messagebox.showwarning("Warning", "Please load an image first")
             return
-        if len(self.current_image.shape) == 3:
-            img = self.current_image.copy()
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        else:
-            img = cv2.cvtColor(self.current_image, cv2.COLOR_GRAY2BGR)
-            gray = self.current_image.copy()
-
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-        kernel = np.ones((3,3), np.uint8)
-        opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=2)
-        sure_bg = cv2.dilate(opening, kernel, iterations=3)
-        dist_transform = cv2.distanceTransform(opening, cv2.DIST_L2, 5)
-        _, sure_fg = cv2.threshold(dist_transform, 0.7 * dist_transform.max(), 255, 0)
-        sure_fg = np.uint8(sure_fg)
-        unknown = cv2.subtract(sure_bg, sure_fg)
-        _, markers = cv2.connectedComponents(sure_fg)
-        markers = markers + 1
-        markers[unknown == 255] = 0
-        markers = cv2.watershed(img, markers)
-        img[markers == -1] = [0, 0, 255]
-        self.current_image = img
-        self.add_to_history()
-        self.display_image()
-        self.update_status("✓ Watershed segmentation applied")
+        dialog = tk.Toplevel(self.root, bg='#353535')
+        dialog.title("Parameter Sweep")
+        dialog.transient(self.root)
+        container = tk.Frame(dialog, bg='#353535')
+        container.pack(fill=tk.BOTH, expand=True, padx=15, pady=10)
+        self.create_section_header(container, "Sweep Parameter")
+        rb_style = {'bg': '#353535', 'fg': '#cccccc', 'selectcolor': '#2b2b2b',
+                    'font': ('Segoe UI', 9)}
+        param = tk.StringVar(value='global_thresh')
+        range_vars = [tk.StringVar() for _ in range(3)]
+        def load_defaults():
+            _, _, start, stop, count, _ = SWEEP_PARAMS[param.get()]
+            for var, value in zip(range_vars, (start, stop, count)):
+                var.set(str(value))
+        for name, spec in SWEEP_PARAMS.items():
+            tk.Radiobutton(container, text=spec[0], variable=param, value=name,
+                           command=load_defaults, **rb_style).pack(anchor=tk.W, pady=1)
+        load_defaults()
+        range_frame = tk.Frame(container, bg='#353535')
+        range_frame.pack(fill=tk.X, pady=8)
+        for col, (label, var) in enumerate(zip(("From", "To", "Count"), range_vars)):
+            tk.Label(range_frame, text=label, bg='#353535', fg='#cccccc',
+                     font=('Segoe UI', 9)).grid(row=0, column=col, padx=4)
+            tk.Entry(range_frame, textvariable=var, width=8).grid(row=1, column=col, padx=4)
+        tk.Label(container, text="Other settings (adaptive method, Gaussian\nkernel) are taken from their panels.",
+                 bg='#353535', fg='#bbbbbb', font=('Segoe UI', 8), justify=tk.LEFT).pack(anchor=tk.W)
+        filter_type = tk.StringVar(value='lowpass')
+        freq_frame = tk.Frame(container, bg='#353535')
+        freq_frame.pack(fill=tk.X, pady=4)
+        tk.Radiobutton(freq_frame, text="D₀: Ideal LPF", variable=filter_type, value='lowpass',
+                       **rb_style).pack(side=tk.LEFT)
+        tk.Radiobutton(freq_frame, text="D₀: Ideal HPF", variable=filter_type, value='highpass',
+                       **rb_style).pack(side=tk.LEFT)
+        def start():
+            try:
+                start_val, stop_val = float(range_vars[0].get()), float(range_vars[1].get())
+                count = int(range_vars[2].get())
+            except ValueError:
+                messagebox.showerror("Error", "Sweep range must be numeric", parent=dialog)
+                return
+            dialog.destroy()
+            values = sweep_values(param.get(), start_val, stop_val, count)
+            self.run_parameter_sweep(param.get(), values, filter_type.get())
+        tk.Button(container, text="▶ Run Sweep", command=start,
+                  bg='#27ae60', fg='white', font=('Segoe UI', 10, 'bold'),
+                  relief=tk.FLAT, cursor='hand2', activebackground='#1e8449').pack(pady=10)
+
+    def run_parameter_sweep(self, param, values, filter_type='lowpass'):
+        k = int(self.gauss_kernel.get())
+        if k % 2 == 0: k += 1
+        fixed = {'adaptive_method': self.adaptive_method.get(), 'gauss_kernel': k,
+                 'filter_type': filter_type}
+        halo = {'block_size': max(values) // 2, 'gauss_sigma': k // 2}.get(param, 0)
+        region, crop = self.crop_selection(halo)
+        # Sweeps run on 8-bit data; the image itself is only converted if a result is applied
+        region = to_uint8(region)
+        self.update_status(f"⏳ Sweeping {SWEEP_PARAMS[param][0]} over {len(values)} values...")
+        self.root.update_idletasks()
+        results = run_sweep(region, param, values, fixed, stats=self.get_image_stats(region))
+        self.show_contact_sheet(param, values, results, crop, self.current_image, self.selection_coords)
+        self.update_status(f"✓ Sweep done: {len(values)} results. Click one to apply it")
+
+    def show_contact_sheet(self, param, values, results, crop, source, selection):
+        # The sheet is not modal: results are composited onto the image and selection
+        # the sweep ran on, and only while that image is still the current one
+        short = SWEEP_PARAMS[param][1]
+        labels = [f"{short}={v}" for v in values]
+        cols = min(len(results), 5)
+        sheet, cell_w, cell_h = make_contact_sheet([thumb for _, thumb in results], labels, cols)
+        window = tk.Toplevel(self.root, bg='#1e1e1e')
+        window.title(f"Sweep: {SWEEP_PARAMS[param][0]}")
+        canvas = tk.Canvas(window, width=sheet.shape[1], height=sheet.shape[0],
+                           bg='#1e1e1e', highlightthickness=0, cursor='hand2')
+        canvas.pack()
+        window.sheet_photo = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(sheet, cv2.COLOR_BGR2RGB)))
+        canvas.create_image(0, 0, anchor=tk.NW, image=window.sheet_photo)
+        def on_click(event):
+            index = (event.y // cell_h) * cols + event.x // cell_w
+            if event.x // cell_w >= cols or index >= len(results):
+                return
+            window.destroy()
+            if self.current_image is not source:
+                messagebox.showwarning("Warning", "The image has changed since the sweep.\nPlease run the sweep again.")
+                return
+            self.current_image = self.composite_selection(unpack_from_history(results[index][0]), crop,
+                                                          to_uint8(source), selection)
+            self.add_to_history()
+            self.display_image()
+            region = " to selection" if crop is not None else ""
+            self.update_status(f"✓ Sweep result {labels[index]} applied{region}")
+        canvas.bind('<ButtonPress-1>', on_click)
 
     # ========== HISTOGRAM ==========
     def update_histogram(self):
@@ -1086,13 +3281,8 @@ class ImageEditor:
             self.hist_canvas_agg.draw()
             return
 
-        if len(self.current_image.shape) == 3:
-            b, g, r = cv2.split(self.current_image)
-            channels = [b, g, r]
-            colors = ['blue', 'green', 'red']
-        else:
-            channels = [self.current_image]
-            colors = ['white']
+        hists = self.get_image_stats(self.current_image).histograms()
+        colors = ['blue', 'green', 'red'] if len(hists) == 3 else ['white']
 
         self.hist_ax.clear()
         self.hist_ax.set_facecolor('#3c3c3c')
@@ -1105,8 +3295,7 @@ class ImageEditor:
         self.hist_ax.set_xlabel('Pixel Intensity', color='white', fontsize=9)
 
         max_freq = 0
-        for channel, color in zip(channels, colors):
-            hist, bins = np.histogram(channel.ravel(), bins=256, range=[0, 256])
+        for hist, color in zip(hists, colors):
             max_freq = max(max_freq, np.max(hist))
             self.hist_ax.plot(hist, color=color, linewidth=1.2)
 
@@ -1131,12 +3320,24 @@ class ImageEditor:
         if canvas_width <= 1 or canvas_height <= 1:
             canvas_width = 800
             canvas_height = 600
-        img_rgb = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2RGB)
-        h, w = img_rgb.shape[:2]
+        shown = self.current_image
+        if self.seed_mode and self.seeded_watershed is not None and self.seed_source is self.current_image:
+            shown = self.seeded_watershed.overlay
+        h, w = shown.shape[:2]
         scale = min(canvas_width/w, canvas_height/h, 1.0)
         new_w = int(w * scale)
         new_h = int(h * scale)
-        img_resized = cv2.resize(img_rgb, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        # Shrink first so depth and color conversion only touch canvas-sized pixels,
+        # into buffers reused from the last repaint
+        if (new_w, new_h) != (w, h):
+            shown = cv2.resize(shown, (new_w, new_h), interpolation=cv2.INTER_AREA,
+                               dst=self.buffers.get(('display', shown.dtype.str), (new_h, new_w) + shown.shape[2:],
+                                                    shown.dtype))
+        img_resized = to_uint8(shown)
+        if len(img_resized.shape) == 3:
+            # PIL shows single-channel data directly as mode 'L'
+            img_resized = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB,
+                                       dst=self.buffers.get('display_rgb', img_resized.shape))
         img_pil = Image.fromarray(img_resized)
         self.photo = ImageTk.PhotoImage(img_pil)
         self.canvas.delete("all")
@@ -1161,8 +3362,356 @@ class ImageEditor:
         else:
             self.status_bar.config(text=message)
 
+# ========== UI LATENCY BENCHMARK ==========
+# Drives a real ImageEditor with scripted events and times each one until Tk has
+# drawn the result. Needs a display; run headless as `xvfb-run python Project.py bench-ui`.
+UI_BENCH_SIZES = [(800, 600), (2000, 1500), (4000, 3000)]
+UI_BENCH_REPEATS = 30
+UI_BENCH_WARMUP = 3
+
+def _bench_image(width, height):
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (max(2, height // 50), max(2, width // 50), 3)).astype(np.uint8)
+    img = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    return cv2.add(img, rng.integers(0, 16, img.shape).astype(np.uint8))
+
+def _settle(root):
+    # Run handlers and idle redraws, then a server round trip so the paint requests
+    # have reached the X server
+    root.update_idletasks()
+    root.update()
+    root.winfo_pointerxy()
+
+def _latency_summary(samples):
+    ms = np.array(samples) * 1000
+    return {'n': len(ms), 'mean_ms': round(float(ms.mean()), 3),
+            'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p90_ms': round(float(np.percentile(ms, 90)), 3),
+            'p99_ms': round(float(np.percentile(ms, 99)), 3),
+            'max_ms': round(float(ms.max()), 3)}
+
+def _time_action(root, action, repeats):
+    for i in range(UI_BENCH_WARMUP):
+        action(i)
+        _settle(root)
+    samples = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        action(i)
+        _settle(root)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def _ui_scenarios(root, app):
+    canvas = app.canvas
+    geometries = ["1200x880", "1100x800"]
+    def resize(i):
+        root.geometry(geometries[i % 2])
+    def drag_start():
+        if not app.selection_active:
+            app.toggle_selection_mode()
+        cw, ch = canvas.winfo_width(), canvas.winfo_height()
+        canvas.event_generate('<ButtonPress-1>', x=cw // 4, y=ch // 4)
+    def drag(i):
+        cw, ch = canvas.winfo_width(), canvas.winfo_height()
+        canvas.event_generate('<B1-Motion>', x=cw // 2 + i % 40 * 4, y=ch // 2 + i % 30 * 3)
+    def drag_end():
+        canvas.event_generate('<ButtonRelease-1>', x=canvas.winfo_width() // 2, y=canvas.winfo_height() // 2)
+        app.toggle_selection_mode()
+        app.clear_selection()
+    def history_start():
+        for _ in range(2):
+            app.apply_brightness_contrast()
+    def undo_redo(i):
+        if i % 2 == 0:
+            app.undo()
+        else:
+            app.redo()
+    # (name, setup, action, teardown)
+    return [
+        ('display_image', None, lambda i: app.display_image(), None),
+        ('update_histogram', None, lambda i: app.update_histogram(), None),
+        ('resize', None, resize, lambda: resize(0)),
+        ('selection_drag', drag_start, drag, drag_end),
+        ('apply', None, lambda i: app.apply_brightness_contrast(), None),
+        ('undo_redo', history_start, undo_redo, None),
+    ]
+
+def benchmark_ui(sizes=UI_BENCH_SIZES, repeats=UI_BENCH_REPEATS, progress=None):
+    root = tk.Tk()
+    root.geometry("1200x880")
+    app = ImageEditor(root)
+    _settle(root)
+    results = []
+    try:
+        for width, height in sizes:
+            app.load_image(_bench_image(width, height), f"bench_{width}x{height}")
+            _settle(root)
+            for name, setup, action, teardown in _ui_scenarios(root, app):
+                if setup:
+                    setup()
+                    _settle(root)
+                samples = _time_action(root, action, repeats)
+                if teardown:
+                    teardown()
+                    _settle(root)
+                row = {'scenario': name, 'width': width, 'height': height, **_latency_summary(samples)}
+                results.append(row)
+                if progress:
+                    progress(row)
+    finally:
+        root.destroy()
+    return results
+
+def _format_latency_row(row, baseline=None):
+    line = (f"{row['scenario']:<17}{row['width']:>5}x{row['height']:<5}"
+            f"{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}")
+    if baseline:
+        line += f"{row['p50_ms'] / max(baseline['p50_ms'], 1e-9):>8.2f}x{row['p90_ms'] / max(baseline['p90_ms'], 1e-9):>7.2f}x"
+    return line
+
+def benchmark_ui_main(argv):
+    parser = argparse.ArgumentParser(prog="Project.py bench-ui",
+                                     description="Event-to-paint latency of the editor UI")
+    parser.add_argument('--sizes', nargs='+', default=[f"{w}x{h}" for w, h in UI_BENCH_SIZES],
+                        help="image sizes as WxH")
+    parser.add_argument('--repeats', type=int, default=UI_BENCH_REPEATS)
+    parser.add_argument('--out', default='ui_latency.json')
+    parser.add_argument('--compare', help="earlier results file; prints p50/p90 ratios against it")
+    args = parser.parse_args(argv)
+    if os.name != 'nt' and not os.environ.get('DISPLAY'):
+        print("bench-ui needs a display; run it as: xvfb-run python Project.py bench-ui", file=sys.stderr)
+        return 2
+    sizes = [tuple(int(v) for v in size.lower().split('x')) for size in args.sizes]
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(r['scenario'], r['width'], r['height']): r for r in json.load(f)['results']}
+    header = f"{'scenario':<17}{'size':<11}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    print(header + ("  p50 / p90 vs baseline" if baseline else ""))
+    def progress(row):
+        print(_format_latency_row(row, baseline.get((row['scenario'], row['width'], row['height']))))
+    results = benchmark_ui(sizes, args.repeats, progress)
+    meta = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeats': args.repeats,
+            'python': sys.version.split()[0], 'opencv': cv2.__version__, 'numpy': np.__version__,
+            'tk': tk.TkVersion, 'cpus': os.cpu_count()}
+    with open(args.out, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+    print(f"Results written to {args.out}")
+    return 0
+
+# ========== AUTO-TUNING ==========
+# `python Project.py tune` times the competing implementations on this machine and
+# writes a profile; it is applied on import, so the editor, the batch commands and
+# worker processes all run with the same crossovers. Size-dependent choices are kept
+# per bucket as (max pixels, value) rows.
+TUNING_PROFILE_PATH = os.environ.get('IMAGE_EDITOR_TUNING',
+                                     os.path.join(os.path.expanduser('~'), '.image_editor_tuning.json'))
+TUNING_VERSION = 1
+TUNING_SIZES = [(500, 500), (1000, 1000), (2000, 2000), (4000, 4000)]
+TUNABLE_CONSTANTS = ('EXECUTOR_PARALLEL_MIN_PIXELS', 'GAUSSIAN_IIR_CROSSOVER', 'MORPH_VHGW_CROSSOVER',
+                     'MEDIAN_BAND_COST', 'MEDIAN_SORT_COST')
+_tuned_tables = {}
+_cv2_threads = None
+
+def tuned_value(name, pixels, default):
+    table = _tuned_tables.get(name)
+    if not table:
+        return default
+    for max_pixels, value in table:
+        if pixels <= max_pixels:
+            return value
+    return table[-1][1]
+
+def use_tuned_threads(pixels):
+    global _cv2_threads
+    threads = tuned_value('cv2_threads', pixels, None)
+    if threads is not None and threads != _cv2_threads:
+        cv2.setNumThreads(threads)
+        _cv2_threads = threads
+
+def _tuning_host():
+    return {'cpu_count': os.cpu_count(), 'opencv': cv2.__version__, 'numpy': np.__version__}
+
+def apply_tuning_profile(profile):
+    for name, value in profile.get('constants', {}).items():
+        if name in TUNABLE_CONSTANTS:
+            globals()[name] = value
+    _tuned_tables.clear()
+    _tuned_tables.update(profile.get('tables', {}))
+
+def load_tuning_profile(path=TUNING_PROFILE_PATH):
+    # A missing, unreadable or foreign profile leaves the built-in defaults in place
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if profile.get('version') != TUNING_VERSION or profile.get('host') != _tuning_host():
+        return None
+    apply_tuning_profile(profile)
+    return profile
+
+def _best_time(fn, repeats):
+    fn()
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _crossover(candidates, faster, beyond):
+    # Smallest candidate from which the alternative wins at every larger candidate too;
+    # `beyond` when it never does within the tested range
+    result = beyond
+    for value in reversed(candidates):
+        if not faster[value]:
+            break
+        result = value
+    return result
+
+def _tune_threads(images, repeats):
+    cpu = os.cpu_count() or 1
+    candidates = sorted({1, 2, 4, cpu // 2, cpu} & set(range(1, cpu + 1)))
+    table, timings = [], {}
+    for img in images:
+        def workload():
+            cv2.GaussianBlur(img, (15, 15), 0)
+            cv2.medianBlur(img, 5)
+            cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        times = {}
+        for n in candidates:
+            cv2.setNumThreads(n)
+            times[n] = _best_time(workload, repeats)
+        table.append([img.shape[0] * img.shape[1], min(times, key=times.get)])
+        timings[str(table[-1][0])] = times
+    cv2.setNumThreads(cpu)
+    return table, timings
+
+def _tune_dither(images, repeats):
+    table, timings = [], {}
+    for img in images:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        times = {s: _best_time(lambda: ordered_dither(gray, 3, s), repeats) for s in DITHER_STRATEGIES}
+        table.append([gray.size, min(times, key=times.get)])
+        timings[str(gray.size)] = times
+    return table, timings
+
+def _tune_parallel(images, repeats):
+    # Pixel count from which splitting across threads beats one call, for both the
+    # per-channel and the per-band paths of execute_operation
+    workers = os.cpu_count() or 1
+    op = OPERATIONS['median_filter']
+    params = {'k': 5}
+    faster, timings = {}, {}
+    for img in images:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        direct = _best_time(lambda: op.func(ImageStats(img), **params), repeats) + \
+            _best_time(lambda: op.func(ImageStats(gray), **params), repeats)
+        split = _best_time(lambda: _execute_channels(op, img, params), repeats) + \
+            _best_time(lambda: _execute_bands(op, gray, params, 2, workers), repeats)
+        faster[gray.size] = workers > 1 and split < direct
+        timings[str(gray.size)] = {'direct': direct, 'split': split}
+    return _crossover(sorted(faster), faster, 4 * max(faster)), timings
+
+def _tune_gaussian(img, repeats):
+    candidates = [31, 51, 75, 97, 151, 201, 301, 401]
+    faster, timings = {}, {}
+    for k in candidates:
+        sigma = (k - 1) / 6
+        spatial = _best_time(lambda: cv2.GaussianBlur(img, (k, k), sigma), repeats)
+        recursive = _best_time(lambda: recursive_gaussian(img, sigma), repeats)
+        faster[k] = recursive < spatial
+        timings[str(k)] = {'spatial': spatial, 'recursive': recursive}
+    return _crossover(candidates, faster, candidates[-1] + 2), timings
+
+def _tune_morphology(img, repeats):
+    candidates = [51, 101, 201, 301, 401, 601, 801]
+    faster, timings = {}, {}
+    for k in candidates:
+        opencv = _best_time(lambda: cv2.erode(img, _line_kernel(k, 0)), repeats)
+        vhgw = _best_time(lambda: _vhgw(img, k, 1, np.minimum), repeats)
+        faster[k] = vhgw < opencv
+        timings[str(k)] = {'opencv': opencv, 'vhgw': vhgw}
+    return _crossover(candidates, faster, candidates[-1] + 2), timings
+
+def _tune_median(repeats):
+    # The two per-tile strategies of _median_uint on one 16-bit tile
+    k, tile = 7, MEDIAN_TILE
+    r = k // 2
+    src = np.random.default_rng(0).integers(0, 65536, (tile + k - 1, tile + k - 1)).astype(np.uint16)
+    hi = src[r:r + tile, r:r + tile] >> 8
+    out = np.empty((tile, tile), np.uint16)
+    def band():
+        base = np.uint16(hi[0, 0] << 8)
+        med = cv2.medianBlur((np.clip(src, base, base + 255) - base).astype(np.uint8), k)[r:r + tile, r:r + tile]
+        sel = hi == hi[0, 0]
+        out[sel] = med[sel] + base
+    band_time = _best_time(band, repeats * 20)
+    sort_time = _best_time(lambda: _median_sorted(src, k, tile, tile), repeats * 5)
+    return round(band_time * 1e9 / src.size, 1), round(sort_time * 1e9 / (tile * tile * k * k), 2)
+
+def calibrate(sizes=TUNING_SIZES, repeats=5, progress=None):
+    def step(name):
+        if progress:
+            progress(name)
+    images = [_bench_image(w, h) for w, h in sizes]
+    mid = cv2.cvtColor(images[min(1, len(images) - 1)], cv2.COLOR_BGR2GRAY)
+    profile = {'version': TUNING_VERSION, 'host': _tuning_host(),
+               'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'constants': {}, 'tables': {}, 'timings': {}}
+    step("OpenCV threads")
+    profile['tables']['cv2_threads'], profile['timings']['cv2_threads'] = _tune_threads(images, repeats)
+    step("dithering")
+    profile['tables']['dither_strategy'], profile['timings']['dither_strategy'] = _tune_dither(images, repeats)
+    step("threaded execution")
+    constants, timings = profile['constants'], profile['timings']
+    constants['EXECUTOR_PARALLEL_MIN_PIXELS'], timings['parallel'] = _tune_parallel(images, repeats)
+    step("Gaussian crossover")
+    constants['GAUSSIAN_IIR_CROSSOVER'], timings['gaussian'] = _tune_gaussian(mid, repeats)
+    step("morphology crossover")
+    constants['MORPH_VHGW_CROSSOVER'], timings['morphology'] = _tune_morphology(mid, repeats)
+    step("median costs")
+    constants['MEDIAN_BAND_COST'], constants['MEDIAN_SORT_COST'] = _tune_median(repeats)
+    return profile
+
+def tune_main(argv):
+    parser = argparse.ArgumentParser(prog="Project.py tune",
+                                     description="Time the competing implementations on this machine "
+                                                 "and save a tuning profile")
+    parser.add_argument('--out', default=TUNING_PROFILE_PATH)
+    parser.add_argument('--quick', action='store_true', help="skip the largest size and repeat less")
+    args = parser.parse_args(argv)
+    sizes = TUNING_SIZES[:-1] if args.quick else TUNING_SIZES
+    start = time.monotonic()
+    profile = calibrate(sizes, 2 if args.quick else 5,
+                        progress=lambda name: print(f"Timing {name}...", file=sys.stderr, flush=True))
+    with open(args.out + '.tmp', 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(args.out + '.tmp', args.out)
+    apply_tuning_profile(profile)
+    print(f"Calibrated in {time.monotonic() - start:.0f}s")
+    for name, value in profile['constants'].items():
+        print(f"  {name} = {value}")
+    for name, table in profile['tables'].items():
+        print(f"  {name}: " + ", ".join(f"≤{px / 1e6:g}MP → {value}" for px, value in table))
+    print(f"Profile written to {args.out}")
+    return 0
+
+load_tuning_profile()
+
 # ========== MAIN ==========
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "analyze":
+        sys.exit(analyze_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "bench-ui":
+        sys.exit(benchmark_ui_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "macro":
+        sys.exit(macro_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "halftone":
+        sys.exit(halftone_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "tune":
+        sys.exit(tune_main(sys.argv[2:]))
     root = tk.Tk()
     app = ImageEditor(root)
     root.bind('<Control-o>', lambda e: app.open_image())
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Project import ImageStats
+
+
+def test_otsu_threshold_matches_cv2():
+    rng = np.random.default_rng(0)
+    for t in range(3000):
+        h, w = (int(v) for v in rng.integers(1, 60, 2))
+        if t % 2:
+            # Few distinct levels give exact ties between thresholds
+            img = rng.choice(rng.integers(0, 256, 3), (h, w)).astype(np.uint8)
+        else:
+            img = cv2.GaussianBlur(rng.integers(0, 256, (h, w, 3)).astype(np.uint8), (0, 0), 2)
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        expected = int(cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[0])
+        assert ImageStats(img).otsu_threshold() == expected
+
+
+def test_otsu_threshold_breaks_ties_like_cv2():
+    # Three equally spaced levels with symmetric counts make whole runs of thresholds tie
+    for low in range(0, 120, 7):
+        for step in range(5, 60, 6):
+            for count in (1, 3, 20):
+                for middle in (1, 2, 5):
+                    levels = np.array([low, low + step, low + 2 * step], dtype=np.uint8)
+                    img = np.repeat(levels, [count, count * middle, count]).reshape(1, -1)
+                    expected = int(cv2.threshold(img, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[0])
+                    assert ImageStats(img).otsu_threshold() == expected
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Project import read_image, replay_files, replay_output_paths, run_chain
+
+
+def test_same_name_in_different_folders_gets_separate_outputs(tmp_path):
+    rng = np.random.default_rng(0)
+    for folder in ('a', 'b'):
+        os.makedirs(tmp_path / 'in' / folder)
+        cv2.imwrite(str(tmp_path / 'in' / folder / 'img.png'), rng.integers(0, 256, (20, 30), dtype=np.uint8))
+    paths = [str(tmp_path / 'in' / f / 'img.png') for f in ('a', 'b')]
+    out_dir = str(tmp_path / 'out')
+    steps = [('brightness_contrast', {'brightness': 10, 'contrast': 1.0})]
+    done, failed = replay_files(paths, steps, out_dir, workers=1)
+    assert sorted(done) == sorted(paths) and not failed
+    for folder, path in zip(('a', 'b'), paths):
+        result = cv2.imread(os.path.join(out_dir, folder, 'img_macro.png'), cv2.IMREAD_UNCHANGED)
+        np.testing.assert_array_equal(result, run_chain(read_image(path, cache=None), steps))
+
+
+def test_inputs_mapping_to_one_output_are_refused(tmp_path):
+    path = str(tmp_path / 'img.png')
+    with pytest.raises(ValueError):
+        replay_output_paths([path, os.path.join(str(tmp_path), '.', 'img.png')], str(tmp_path / 'out'))
+
+
+def test_single_file_lands_directly_in_the_output_folder(tmp_path):
+    out_dir = str(tmp_path / 'out')
+    assert replay_output_paths([str(tmp_path / 'x' / 'img.jpg')], out_dir) == [os.path.join(out_dir, 'img_macro.jpg')]
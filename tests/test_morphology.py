@@ -0,0 +1,22 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Project
+from Project import morphology
+
+
+def test_vhgw_matches_cv2(monkeypatch):
+    monkeypatch.setattr(Project, 'MORPH_VHGW_CROSSOVER', 1)
+    rng = np.random.default_rng(0)
+    for shape in ((60, 80), (60, 80, 3), (1, 40)):
+        for dtype in (np.uint8, np.uint16, np.float32):
+            img = (rng.random(shape) * 250).astype(dtype)
+            for width, height in ((2, 1), (3, 5), (9, 4), (51, 101)):
+                kernel = np.ones((height, width), np.uint8)
+                np.testing.assert_array_equal(morphology(img, 'erode', width, height), cv2.erode(img, kernel))
+                np.testing.assert_array_equal(morphology(img, 'dilate', width, height), cv2.dilate(img, kernel))
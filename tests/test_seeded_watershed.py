@@ -0,0 +1,84 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Project import SEED_BACKGROUND, SEED_FOREGROUND, SeededWatershed
+
+
+def make_image(h=240, w=320, seed=0):
+    rng = np.random.default_rng(seed)
+    coarse = rng.random((h // 8, w // 8, 3)).astype(np.float32)
+    img = cv2.GaussianBlur(cv2.resize(coarse, (w, h), interpolation=cv2.INTER_CUBIC), (0, 0), 3)
+    img += rng.normal(0, 0.03, img.shape).astype(np.float32)
+    return np.clip(img * 255, 0, 255).astype(np.uint8)
+
+
+def make_strokes(h, w, count, seed=0):
+    rng = np.random.default_rng(seed)
+    strokes = [([(w // 4, h // 2), (w // 4 + 20, h // 2 + 5)], 4, SEED_FOREGROUND),
+               ([(3 * w // 4, h // 3), (3 * w // 4, h // 3 + 20)], 4, SEED_BACKGROUND)]
+    for _ in range(count):
+        x, y = int(rng.integers(10, w - 10)), int(rng.integers(10, h - 10))
+        points = [(x, y), (min(w - 1, x + int(rng.integers(0, 20))), min(h - 1, y + int(rng.integers(0, 20))))]
+        strokes.append((points, int(rng.integers(2, 6)), int(rng.choice([SEED_BACKGROUND, SEED_FOREGROUND]))))
+    return strokes
+
+
+def full_watershed(watershed):
+    return cv2.watershed(watershed.image, watershed.seeds.copy())
+
+
+def test_settled_strokes_match_full_watershed():
+    for seed in range(3):
+        img = make_image(seed=seed)
+        watershed = SeededWatershed(img)
+        for points, radius, label in make_strokes(*img.shape[:2], 15, seed):
+            watershed.add_stroke(points, radius, label)
+            if watershed.labels is None:
+                continue
+            full = full_watershed(watershed)
+            assert watershed.settle(*watershed.full_run()())
+            np.testing.assert_array_equal(watershed.labels, full)
+            expected = watershed.image.copy()
+            expected[full == -1] = (0, 0, 255)
+            np.testing.assert_array_equal(watershed.result(), expected)
+
+
+def test_result_settles_a_preview():
+    img = make_image(seed=4)
+    watershed = SeededWatershed(img)
+    for points, radius, label in make_strokes(*img.shape[:2], 10, 4):
+        watershed.add_stroke(points, radius, label)
+    full = full_watershed(watershed)
+    result = watershed.result()
+    assert watershed.exact
+    np.testing.assert_array_equal(watershed.labels, full)
+    assert np.array_equal(result[full == -1], np.tile((0, 0, 255), ((full == -1).sum(), 1)))
+
+
+def test_stroke_over_its_own_label_is_resegmented():
+    img = make_image(seed=5)
+    watershed = SeededWatershed(img)
+    for points, radius, label in make_strokes(*img.shape[:2], 0, 5):
+        watershed.add_stroke(points, radius, label)
+    ys, xs = np.nonzero(watershed.labels == SEED_FOREGROUND)
+    x, y = int(xs[len(xs) // 2]), int(ys[len(ys) // 2])
+    watershed.add_stroke([(x, y)], 3, SEED_FOREGROUND)
+    watershed.result()
+    np.testing.assert_array_equal(watershed.labels, full_watershed(watershed))
+
+
+def test_stale_full_run_is_not_adopted():
+    img = make_image(seed=6)
+    watershed = SeededWatershed(img)
+    strokes = make_strokes(*img.shape[:2], 2, 6)
+    for points, radius, label in strokes[:3]:
+        watershed.add_stroke(points, radius, label)
+    job = watershed.full_run()
+    points, radius, label = strokes[3]
+    watershed.add_stroke(points, radius, label)
+    assert not watershed.settle(*job())